@@ -47,13 +47,7 @@ async def register_user(request: Request, user_data: UserCreate):
     User must verify email before logging in.
     """
     try:
-        existing_user = await user_service.get_user_by_email(user_data.email)
-        if existing_user:
-            raise APIException(
-                status_code=status.HTTP_409_CONFLICT,
-                detail="An account with this email already exists. Please sign in instead."
-            )
-
+        # Raises DuplicateEmailException (409) if the email is already registered
         user = await user_service.create(user_data)
         
         # Send OTP for verification
@@ -3,6 +3,7 @@ from datetime import datetime, timezone
 from typing import Optional
 
 from fastapi import APIRouter, Depends, Request, Query
+from fastapi.responses import ORJSONResponse
 
 from app.core.exceptions import SyncConflictException
 from app.core.limiter import limiter
@@ -14,7 +15,7 @@ from app.schemas.user import User
 
 router = APIRouter()
 
-@router.post("/pull", response_model=PullChangesResponse)
+@router.post("/pull", response_model=PullChangesResponse, response_class=ORJSONResponse)
 @limiter.limit("30/minute")
 async def pull_changes_endpoint(
     request: Request,
@@ -24,10 +25,12 @@ async def pull_changes_endpoint(
     """
     Handles the pull part of the synchronization process.
     The client sends the last time it pulled, and the server returns all changes since then.
+    Timestamps are already integer milliseconds, so the payload is returned directly with
+    orjson instead of going through response model validation and jsonable_encoder.
     """
     try:
         changes = await pull_changes(sync_request.last_pulled_at, current_user.id)
-        return {"changes": changes, "timestamp": int(datetime.now(timezone.utc).timestamp() * 1000)}
+        return ORJSONResponse({"changes": changes, "timestamp": int(datetime.now(timezone.utc).timestamp() * 1000)})
     except ValueError as e:
         logging.error(f"Pull sync validation error: {e}", exc_info=True)
         raise SyncConflictException(detail=str(e))
@@ -51,19 +54,19 @@ async def push_changes_endpoint(
         raise SyncConflictException(detail=str(e))
 
 
-@router.post("/pull/batched")
+@router.post("/pull/batched", response_class=ORJSONResponse)
 @limiter.limit("60/minute")
 async def pull_changes_batched_endpoint(
     request: Request,
     sync_request: SyncRequest,
     batch_size: int = Query(default=500, ge=50, le=5000, description="Number of records per batch"),
-    skip_patients: int = Query(default=0, ge=0, description="Number of patient records to skip"),
-    skip_notes: int = Query(default=0, ge=0, description="Number of note records to skip"),
+    cursor_patient: Optional[str] = Query(default=None, description="Cursor of the last patient received"),
+    cursor_note: Optional[str] = Query(default=None, description="Cursor of the last note received"),
     current_user: User = Depends(get_current_user)
 ):
     """
     Batched pull for incremental sync of large datasets.
-    Returns has_more flag and skip values for pagination.
+    Returns has_more flag and cursors for pagination.
     Use this endpoint for first-time sync or when syncing >1000 records.
     """
     try:
@@ -71,10 +74,10 @@ async def pull_changes_batched_endpoint(
             sync_request.last_pulled_at,
             current_user.id,
             batch_size=batch_size,
-            skip_patients=skip_patients,
-            skip_notes=skip_notes
+            cursor_patient=cursor_patient,
+            cursor_note=cursor_note
         )
-        return result
+        return ORJSONResponse(result)
     except ValueError as e:
         logging.error(f"Batched pull sync validation error: {e}", exc_info=True)
         raise SyncConflictException(detail=str(e))
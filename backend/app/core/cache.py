@@ -0,0 +1,141 @@
+"""
+Response cache backend that survives Redis outages.
+
+ResilientCacheBackend serves fastapi-cache from Redis and, when a Redis call
+fails, switches to an in-memory backend until a periodic ping succeeds again.
+Requests never wait on a dead Redis for longer than one socket timeout.
+"""
+import asyncio
+from typing import Optional, Set, Tuple
+
+from fastapi_cache.backends import Backend
+from fastapi_cache.backends.inmemory import InMemoryBackend
+from fastapi_cache.backends.redis import RedisBackend
+from redis import asyncio as aioredis
+from redis.exceptions import RedisError
+
+from app.core.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Prefix of the keys the in-memory fallback stores, followed by the outage number
+MEMORY_KEY_PREFIX = "resilient-cache"
+
+
+class ResilientCacheBackend(Backend):
+    """
+    fastapi-cache backend: Redis while it is healthy, in-memory while it is not.
+
+    Failures are detected on the call that hits them (bounded by the pool's
+    socket timeout); recovery is detected by the health check loop. Clears made
+    during an outage are replayed on Redis before switching back, so entries
+    invalidated in the meantime are not served again.
+
+    In-memory entries are stored under a per-outage namespace, so recovery drops
+    them with the backend's public clear() and a later outage starts empty.
+    """
+
+    def __init__(self, redis: aioredis.Redis, retry_interval: float):
+        self.redis = redis
+        self._redis_backend = RedisBackend(redis)
+        self._memory_backend = InMemoryBackend()
+        self._retry_interval = retry_interval
+        self._redis_up = True
+        self._outage = 0
+        self._pending_clears: Set[Tuple[Optional[str], Optional[str]]] = set()
+        self._health_check_task: Optional[asyncio.Task] = None
+
+    def _memory_namespace(self) -> str:
+        return f"{MEMORY_KEY_PREFIX}:{self._outage}:"
+
+    def _memory_key(self, key: str) -> str:
+        return self._memory_namespace() + key
+
+    def _mark_down(self, error: Exception) -> None:
+        if self._redis_up:
+            self._redis_up = False
+            logger.warning("cache_redis_down_using_memory", error=str(error))
+
+    async def get_with_ttl(self, key: str) -> Tuple[int, Optional[str]]:
+        if self._redis_up:
+            try:
+                return await self._redis_backend.get_with_ttl(key)
+            except (RedisError, OSError) as e:
+                self._mark_down(e)
+        return await self._memory_backend.get_with_ttl(self._memory_key(key))
+
+    async def get(self, key: str) -> Optional[str]:
+        if self._redis_up:
+            try:
+                return await self._redis_backend.get(key)
+            except (RedisError, OSError) as e:
+                self._mark_down(e)
+        return await self._memory_backend.get(self._memory_key(key))
+
+    async def set(self, key: str, value: str, expire: Optional[int] = None) -> None:
+        if self._redis_up:
+            try:
+                return await self._redis_backend.set(key, value, expire)
+            except (RedisError, OSError) as e:
+                self._mark_down(e)
+        return await self._memory_backend.set(self._memory_key(key), value, expire)
+
+    async def clear(self, namespace: Optional[str] = None, key: Optional[str] = None) -> int:
+        if self._redis_up:
+            try:
+                return await self._redis_backend.clear(namespace, key)
+            except (RedisError, OSError) as e:
+                self._mark_down(e)
+        self._pending_clears.add((namespace, key))
+        try:
+            return await self._memory_backend.clear(
+                self._memory_key(namespace) if namespace else None,
+                self._memory_key(key) if key else None
+            )
+        except KeyError:
+            # InMemoryBackend deletes a single key without checking it was cached
+            return 0
+
+    async def ping(self) -> bool:
+        """Ping Redis (used by the health endpoint); raises while Redis is unreachable."""
+        return await self.redis.ping()
+
+    async def _recover(self) -> None:
+        """Replay outage-time clears on Redis, then switch back to it."""
+        await self.redis.ping()
+        while self._pending_clears:
+            namespace, key = self._pending_clears.pop()
+            try:
+                await self._redis_backend.clear(namespace, key)
+            except Exception:
+                self._pending_clears.add((namespace, key))
+                raise
+        # Entries cached in memory during the outage are not in Redis; start clean next time
+        await self._memory_backend.clear(namespace=self._memory_namespace())
+        self._outage += 1
+        self._redis_up = True
+        logger.info("cache_redis_recovered")
+
+    async def _health_check_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self._retry_interval)
+            if self._redis_up:
+                continue
+            try:
+                await self._recover()
+            except (RedisError, OSError) as e:
+                logger.debug("cache_redis_still_down", error=str(e))
+
+    def start(self) -> None:
+        """Start the recovery health check loop. Should be called at application startup."""
+        if self._health_check_task is None:
+            self._health_check_task = asyncio.create_task(self._health_check_loop())
+
+    async def close(self) -> None:
+        """Stop the health check loop and release the Redis pool. Should be called at shutdown."""
+        if self._health_check_task:
+            self._health_check_task.cancel()
+            self._health_check_task = None
+        # The in-memory store is shared by every InMemoryBackend, so drop this backend's entries
+        await self._memory_backend.clear(namespace=self._memory_namespace())
+        await self.redis.connection_pool.disconnect()
@@ -43,6 +43,8 @@ class Settings(BaseSettings):
 
     # --- Cache Settings ---
     REDIS_URL: Optional[str] = "redis://localhost:6379"
+    # Seconds between Redis pings while the response cache runs on its in-memory fallback
+    REDIS_RETRY_INTERVAL: int = 30
 
     @validator("MONGO_URL", "DB_NAME", "SECRET_KEY")
     def not_empty(cls, v):
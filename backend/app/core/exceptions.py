@@ -2,6 +2,8 @@ import logging
 from typing import Optional, Dict, Any
 from fastapi import Request
 from fastapi.responses import JSONResponse
+from starlette.background import BackgroundTask
+from app.core.logging_config import get_request_id
 from app.core.monitoring import capture_exception_with_boundary
 from app.schemas.error_event import ErrorEvent
 
@@ -154,7 +156,7 @@ async def api_exception_handler(request: Request, exc: APIException):
         content={
             "success": False,
             "error": error_dict,
-            "request_id": request.state.request_id if hasattr(request.state, 'request_id') else None,
+            "request_id": get_request_id() or None,
         },
     )
 
@@ -175,21 +177,30 @@ async def generic_exception_handler(request: Request, exc: Exception):
         # Log but don't fail - user extraction is optional for error logging
         logging.debug(f"Could not extract user_id for error logging: {auth_error}")
 
+    request_id = get_request_id() or None
     error_event = ErrorEvent(
         user_id=user_id,
-        request_id=request.state.request_id if hasattr(request.state, 'request_id') else None,
+        request_id=request_id,
         path=request.url.path,
         method=request.method,
         status_code=500,
         error=str(exc),
     )
-    await error_event.insert()
 
+    # The error event is stored after the response body is sent, so the client
+    # does not wait on the database write
     return JSONResponse(
         status_code=500,
         content={
             "success": False,
             "error": {"message": "An unexpected error occurred."},
-            "request_id": request.state.request_id if hasattr(request.state, 'request_id') else None,
+            "request_id": request_id,
         },
+        background=BackgroundTask(_store_error_event, error_event),
     )
+
+async def _store_error_event(error_event: ErrorEvent):
+    try:
+        await error_event.insert()
+    except Exception as e:
+        logging.error(f"Could not store error event: {e}")
@@ -1,11 +1,57 @@
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Tuple
+
 from passlib.context import CryptContext
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# New hashes use argon2id; bcrypt is kept so existing hashes still verify and are
+# upgraded on the next successful login (see verify_and_update_password).
+# The argon2 cost is matched to the legacy bcrypt hashes (passlib's default 12 rounds), so
+# verifying against the dummy hash, an argon2id account or a bcrypt account takes the same
+# time and login timing does not reveal whether an email is registered.
+pwd_context = CryptContext(
+    schemes=["argon2", "bcrypt"],
+    deprecated="auto",
+    argon2__type="ID",
+    argon2__time_cost=5,
+    argon2__memory_cost=64 * 1024,  # KiB
+    argon2__parallelism=1,
+)
+
+# Hashing runs on a bounded pool so a login flood cannot starve the default executor.
+# Threads rather than processes: argon2 and bcrypt release the GIL, so hashes already use every core.
+_hash_executor = ThreadPoolExecutor(max_workers=os.cpu_count() or 1, thread_name_prefix="password-hash")
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verifies a plain password against a hashed password."""
     return pwd_context.verify(plain_password, hashed_password)
 
+def verify_and_update_password(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """
+    Verifies a password and, if it matches a deprecated hash (bcrypt or outdated
+    argon2 parameters), also returns a replacement hash to store.
+    """
+    return pwd_context.verify_and_update(plain_password, hashed_password)
+
 def get_password_hash(password: str) -> str:
     """Hashes a plain password."""
-    return pwd_context.hash(password)
\ No newline at end of file
+    return pwd_context.hash(password)
+
+# Verified against when no user matches, so a miss costs the same hashing work as a wrong password
+DUMMY_PASSWORD_HASH = get_password_hash("dummy-password-for-timing")
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """Verifies a password on the hashing pool without blocking the event loop."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_hash_executor, verify_password, plain_password, hashed_password)
+
+async def verify_and_update_password_async(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """Runs verify_and_update_password on the hashing pool without blocking the event loop."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_hash_executor, verify_and_update_password, plain_password, hashed_password)
+
+async def get_password_hash_async(password: str) -> str:
+    """Hashes a password on the hashing pool without blocking the event loop."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_hash_executor, get_password_hash, password)
@@ -247,6 +247,8 @@ def configure_structlog(json_format: bool = False) -> None:
         json_format: If True, output JSON format (for production)
     """
     processors = [
+        # Drop events below the stdlib level first, before any processor does work on them
+        structlog.stdlib.filter_by_level,
         structlog.stdlib.add_log_level,
         structlog.stdlib.add_logger_name,
         structlog.processors.TimeStamper(fmt="iso"),
@@ -7,9 +7,9 @@ import uuid
 import logging
 
 from app.core.config import settings
+from app.core.auth_context import get_auth_context
 from app.schemas.user import UserPlan, User  # ✅ Import User from schemas (Beanie Document)
 from app.schemas.role import UserRole
-from app.core.hashing import verify_password
 from app.services import user_service
 from app.services.token_blacklist_service import token_blacklist
 
@@ -22,12 +22,7 @@ optional_oauth2 = HTTPBearer(auto_error=False)
 
 
 async def authenticate_user(email: str, password: str) -> User | None:
-    user = await user_service.get_user_by_email(email=email)
-    if not user:
-        return None
-    if not verify_password(password, user.password_hash):
-        return None
-    return user
+    return await user_service.user_service.authenticate(email, password)
 
 # --- JWT Token Creation ---
 def create_access_token(subject: str, plan: str, role: str, expires_delta: Optional[timedelta] = None) -> str:
@@ -98,8 +93,6 @@ async def get_current_user() -> User:
     Returns:
         The authenticated User object from the database.
     """
-    from app.core.auth_context import get_auth_context
-
     context = get_auth_context()
 
     # Check if authenticated
@@ -167,8 +160,6 @@ async def require_pro_user() -> User:
     Returns:
         The authenticated PRO User object from the database.
     """
-    from app.core.auth_context import get_auth_context
-
     context = get_auth_context()
 
     # Check if authenticated
@@ -213,8 +204,6 @@ async def get_optional_current_user() -> Optional[User]:
     Returns:
         The authenticated User object from the database, or None if not authenticated.
     """
-    from app.core.auth_context import get_auth_context
-
     context = get_auth_context()
 
     # Return None if not authenticated
@@ -255,8 +244,6 @@ def require_role(required_role: UserRole):
         """
         Checks if the user has the required role.
         """
-        from app.core.auth_context import get_auth_context
-
         context = get_auth_context()
 
         # Check if authenticated
@@ -1,6 +1,6 @@
 import logging
 from datetime import datetime, timedelta, timezone
-from app.core.hashing import get_password_hash
+from app.core.hashing import get_password_hash_async
 from app.db.session import get_user_collection, get_patient_collection, get_counter_collection
 from app.schemas.user import UserPlan, SubscriptionStatus
 import uuid
@@ -19,11 +19,13 @@ async def init_dummy_data():
         counter_collection = await get_counter_collection()
 
         # --- Create Demo Users ---
+        # Both demo accounts share a password: hash it once, off the event loop
+        demo_password_hash = await get_password_hash_async("password123")
         demo_users = [
             {
                 "id": "demo_user_1", "email": "dr.sarah@clinic.com", "phone": "+1234567890",
                 "full_name": "Dr. Sarah Johnson", "medical_specialty": "cardiology",
-                "password_hash": get_password_hash("password123"), "plan": UserPlan.PRO,
+                "password_hash": demo_password_hash, "plan": UserPlan.PRO,
                 "role": "doctor",
                 "subscription_status": SubscriptionStatus.ACTIVE, "subscription_end_date": datetime.now(timezone.utc) + timedelta(days=365),
                 "created_at": datetime.now(timezone.utc), "updated_at": datetime.now(timezone.utc)
@@ -31,7 +33,7 @@ async def init_dummy_data():
             {
                 "id": "demo_user_2", "email": "dr.mike@physio.com", "phone": "+1987654321",
                 "full_name": "Dr. Mike Chen", "medical_specialty": "physiotherapy",
-                "password_hash": get_password_hash("password123"), "plan": UserPlan.BASIC,
+                "password_hash": demo_password_hash, "plan": UserPlan.BASIC,
                 "role": "doctor",
                 "subscription_status": SubscriptionStatus.ACTIVE, "subscription_end_date": datetime.now(timezone.utc) + timedelta(days=30),
                 "created_at": datetime.now(timezone.utc), "updated_at": datetime.now(timezone.utc)
@@ -0,0 +1,31 @@
+"""
+Beanie document models registered with init_beanie.
+
+Kept in one list so the API, scripts and tests initialize the same collections.
+"""
+from app.schemas.beta_feedback import BetaFeedback
+from app.schemas.clinical_note import ClinicalNote
+from app.schemas.document import Document
+from app.schemas.error_event import ErrorEvent
+from app.schemas.feedback import Feedback
+from app.schemas.google_contacts import DuplicateRecord, GoogleContactsSyncJob
+from app.schemas.patient import Patient
+from app.schemas.query_performance_event import QueryPerformanceEvent
+from app.schemas.sync_event import SyncEvent
+from app.schemas.telemetry import Telemetry
+from app.schemas.user import User
+
+DOCUMENT_MODELS = [
+    User,
+    Patient,
+    ClinicalNote,
+    Document,
+    Feedback,
+    Telemetry,
+    ErrorEvent,
+    QueryPerformanceEvent,
+    SyncEvent,
+    BetaFeedback,
+    GoogleContactsSyncJob,
+    DuplicateRecord,
+]
@@ -14,6 +14,8 @@ from app.core.config import settings
 # --- Connection Pool Settings ---
 MAX_CONNECTIONS_COUNT = int(os.getenv("MAX_CONNECTIONS_COUNT", 100))
 MIN_CONNECTIONS_COUNT = int(os.getenv("MIN_CONNECTIONS_COUNT", 10))
+# Idle sockets above minPoolSize are closed after this long (5 minutes)
+MAX_IDLE_TIME_MS = int(os.getenv("MAX_IDLE_TIME_MS", 300000))
 
 # --- Database Client ---
 # We initialize the client as None and connect in a separate function.
@@ -44,10 +46,16 @@ async def connect_to_mongo():
                 settings.MONGO_URL,
                 maxPoolSize=MAX_CONNECTIONS_COUNT,
                 minPoolSize=MIN_CONNECTIONS_COUNT,
+                maxIdleTimeMS=MAX_IDLE_TIME_MS,
                 serverSelectionTimeoutMS=5000  # Timeout for server selection
             )
             # The ismaster command is cheap and does not require auth.
             await client.admin.command('ismaster')
+            # The driver only fills minPoolSize in the background; concurrent pings open
+            # those sockets now so the first requests after startup skip the handshakes
+            await asyncio.gather(*(
+                client.admin.command('ping') for _ in range(MIN_CONNECTIONS_COUNT)
+            ))
             
         logging.info("Successfully connected to MongoDB.")
     except ConnectionFailure as e:
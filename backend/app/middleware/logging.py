@@ -1,5 +1,5 @@
+import secrets
 import time
-import uuid
 from fastapi import Request, Response
 from starlette.middleware.base import BaseHTTPMiddleware, RequestResponseEndpoint
 from starlette.types import ASGIApp
@@ -22,10 +22,11 @@ class LoggingMiddleware(BaseHTTPMiddleware):
         self.logger = get_logger(__name__)
 
     async def dispatch(self, request: Request, call_next: RequestResponseEndpoint) -> Response:
-        request_id = str(uuid.uuid4())
-        request.state.request_id = request_id
+        # 128 random bits as 32 hex chars: several times cheaper than str(uuid.uuid4())
+        request_id = secrets.token_hex(16)
 
         # Set request ID in context for propagation throughout the request lifecycle
+        # (exception handlers read it from here too)
         set_request_id(request_id)
 
         user_id = await self.get_user_id(request)
@@ -33,17 +34,19 @@ class LoggingMiddleware(BaseHTTPMiddleware):
         # Set user ID in context for propagation
         set_context_user_id(user_id)
 
-        start_time = time.time()
+        # Monotonic integer clock: immune to wall-clock adjustments, no float math until formatting
+        start_time = time.perf_counter_ns()
 
         response = await call_next(request)
 
-        process_time = (time.time() - start_time) * 1000
+        process_time = (time.perf_counter_ns() - start_time) / 1_000_000
 
         self.logger.info(
             "request",
             request_id=request_id,
             method=request.method,
-            path=request.url.path,
+            # scope["path"] is the same string; request.url would build and parse a full URL
+            path=request.scope["path"],
             query_params=str(request.query_params),
             user_id=user_id,
             client_ip=request.client.host,
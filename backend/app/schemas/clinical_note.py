@@ -1,8 +1,9 @@
 from pydantic import BaseModel, Field
 from datetime import datetime, timezone
-from typing import Literal
+from typing import Literal, Optional
 import uuid
 from beanie import Document, Indexed
+from pymongo import IndexModel
 
 # Field length constants
 MAX_NOTE_LENGTH = 5000
@@ -16,9 +17,23 @@ class ClinicalNote(Document):
     visit_type: Literal["initial", "regular", "follow-up", "emergency"] = "regular"
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
     updated_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    # Soft delete marker; always stored (null when live) so sync can match on null
+    deleted_at: Optional[datetime] = None
 
     class Settings:
         name = "clinical_notes"
+        indexes = [
+            # Sync queries: created/updated-since and soft-deleted-since lookups
+            IndexModel([("user_id", 1), ("created_at", 1)]),
+            IndexModel([("user_id", 1), ("updated_at", -1)], name="idx_sync_notes"),
+            # New name: the sparse index this replaces keeps idx_user_deleted_at until
+            # scripts/migrate_deleted_at.py drops it (same name, other options would conflict)
+            IndexModel(
+                [("user_id", 1), ("deleted_at", 1)],
+                name="idx_user_deleted_at_partial",
+                partialFilterExpression={"deleted_at": {"$type": "date"}}
+            ),
+        ]
 
     class Config:
         populate_by_name = True
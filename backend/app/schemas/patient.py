@@ -56,12 +56,23 @@ class Patient(Document):
     last_synced_at: Optional[datetime] = None
     sync_version: Optional[int] = Field(default=0)
     local_modified_at: Optional[datetime] = None
+    # Soft delete marker; always stored (null when live) so sync can match on null
+    deleted_at: Optional[datetime] = None
 
     class Settings:
         name = "patients"
         indexes = [
             IndexModel([("user_id", 1), ("patient_id", 1)], unique=True),
             IndexModel([("user_id", 1), ("created_at", -1)]),
+            # Sync queries: updated-since and soft-deleted-since lookups
+            IndexModel([("user_id", 1), ("updated_at", -1)], name="idx_sync_patients"),
+            # New name: the sparse index this replaces keeps idx_user_deleted_at until
+            # scripts/migrate_deleted_at.py drops it (same name, other options would conflict)
+            IndexModel(
+                [("user_id", 1), ("deleted_at", 1)],
+                name="idx_user_deleted_at_partial",
+                partialFilterExpression={"deleted_at": {"$type": "date"}}
+            ),
             IndexModel([("user_id", 1), ("external_id", 1)]),
             IndexModel([("user_id", 1), ("source", 1)])
         ]
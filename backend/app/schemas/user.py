@@ -4,7 +4,8 @@ from datetime import datetime, timedelta, timezone
 import uuid
 import re
 from enum import Enum
-from beanie import Document, Indexed
+from beanie import Document, Indexed, after_event, Insert, Replace, Save, SaveChanges, Update, Delete
+from pymongo import IndexModel
 from .role import UserRole
 
 PyObjectId = Annotated[str, BeforeValidator(str)]
@@ -85,8 +86,28 @@ class User(Document):
     # Google OAuth Integration
     google_oauth_tokens: Optional[GoogleOAuthTokens] = None
 
+    @after_event(Insert, Replace, Save, SaveChanges, Update, Delete)
+    def evict_user_cache(self):
+        # Document-level writes only: query-level and raw motor writes must evict themselves
+        # Lazy import to avoid circular dependency (user_service imports this module)
+        from app.services.user_service import invalidate_cached_user
+        invalidate_cached_user(str(self.id))
+
     class Settings:
         name = "users"
+        indexes = [
+            # Legacy rows stored the UUID in an "id" field; get_user_by_id falls back to it
+            IndexModel(
+                [("id", 1)],
+                name="idx_user_legacy_id",
+                sparse=True
+            ),
+            # Password reset looks users up by the hashed reset token
+            IndexModel(
+                [("password_reset_token", 1)],
+                name="idx_user_password_reset_token"
+            ),
+        ]
 
 class UserCreate(BaseModel):
     email: EmailStr
@@ -13,6 +13,7 @@ from app.schemas.user import User
 from app.core.config import settings
 from app.core.logger import get_logger
 from app.services.email_service import email_service
+from app.services.user_service import invalidate_cached_user
 
 logger = get_logger(__name__)
 
@@ -94,6 +95,8 @@ class OTPService:
         result = await User.find_one(
             {"_id": user.id, "otp_attempts": {"$lt": settings.OTP_MAX_ATTEMPTS}}
         ).update({"$inc": {"otp_attempts": 1}})
+        # Query-level updates bypass the User write hooks, so evict the cached row here
+        invalidate_cached_user(str(user.id))
 
         # If no document was updated, another request already maxed out attempts
         if not result or result.modified_count == 0:
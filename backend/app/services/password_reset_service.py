@@ -10,7 +10,7 @@ from datetime import datetime, timezone, timedelta
 from typing import Optional, Tuple
 from app.schemas.user import User
 from app.core.config import settings
-from app.core.hashing import get_password_hash
+from app.core.hashing import get_password_hash_async
 from app.core.logger import get_logger
 from app.services.email_service import email_service
 
@@ -109,17 +109,14 @@ class PasswordResetService:
         Returns (success, message) tuple.
         """
         try:
-            # Hash new password
-            user.password_hash = get_password_hash(new_password)
-            
-            # Clear reset token
-            user.password_reset_token = None
-            user.password_reset_expires_at = None
-            
-            # Update timestamp
-            user.updated_at = datetime.now(timezone.utc)
-            
-            await user.save()
+            # Hash new password off the event loop, then clear the reset token and bump
+            # the timestamp in one partial $set rather than replacing the document
+            await user.set({
+                "password_hash": await get_password_hash_async(new_password),
+                "password_reset_token": None,
+                "password_reset_expires_at": None,
+                "updated_at": datetime.now(timezone.utc),
+            })
 
             logger.info("password_reset_success", email=user.email)
             return True, "Password reset successfully"
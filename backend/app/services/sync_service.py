@@ -1,10 +1,11 @@
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
 import logging
 import asyncio
 from app.schemas.patient import Patient
 from app.schemas.clinical_note import ClinicalNote
 from app.schemas.sync_event import SyncEvent
 from typing import Dict, Any, List, Optional, Tuple
+from pymongo import UpdateOne
 from app.core.exceptions import SyncConflictException
 from app.core.config import settings
 
@@ -13,50 +14,132 @@ MAX_SYNC_RECORDS = getattr(settings, 'MAX_SYNC_RECORDS', 5000)
 DEFAULT_BATCH_SIZE = getattr(settings, 'SYNC_BATCH_SIZE', 500)
 MIN_BATCH_SIZE = getattr(settings, 'MIN_SYNC_BATCH_SIZE', 50)
 
+# Successful sync events are buffered and written in batches off the request path
+SYNC_EVENT_FLUSH_INTERVAL = 0.1  # seconds
+SYNC_EVENT_FLUSH_SIZE = 100
+
+_pending_sync_events: List[SyncEvent] = []
+_sync_event_tasks: set = set()
+_sync_event_flusher: Optional[asyncio.Task] = None
+
+
+async def flush_sync_events() -> None:
+    """Write all buffered sync events with a single insert_many."""
+    if not _pending_sync_events:
+        return
+    events = _pending_sync_events[:]
+    _pending_sync_events.clear()
+    try:
+        await SyncEvent.insert_many(events)
+    except Exception as e:
+        logging.warning(f"[SYNC] Failed to record {len(events)} sync event(s): {e}")
+
+
+async def _sync_event_flush_loop() -> None:
+    while _pending_sync_events:
+        await asyncio.sleep(SYNC_EVENT_FLUSH_INTERVAL)
+        await flush_sync_events()
+
+
+def record_sync_event(event: SyncEvent) -> None:
+    """
+    Queue a sync event for a background batched insert instead of awaiting the write.
+    The flusher runs while events are pending and exits once the buffer is drained.
+    """
+    global _sync_event_flusher
+    _pending_sync_events.append(event)
+
+    if len(_pending_sync_events) >= SYNC_EVENT_FLUSH_SIZE:
+        task = asyncio.create_task(flush_sync_events())
+        _sync_event_tasks.add(task)
+        task.add_done_callback(_sync_event_tasks.discard)
+
+    loop = asyncio.get_running_loop()
+    if _sync_event_flusher is None or _sync_event_flusher.done() or _sync_event_flusher.get_loop() is not loop:
+        _sync_event_flusher = loop.create_task(_sync_event_flush_loop())
+
+
+# Fields sent to clients, computed once per model. deleted_at is server-side only:
+# live records always have it null and deletions are sent as id lists.
+_SYNC_FIELDS = {
+    model: frozenset(model.model_fields) - {"deleted_at"}
+    for model in (Patient, ClinicalNote)
+}
+_TIMESTAMP_FIELDS = ('created_at', 'updated_at')
+
+# (field, stored key, default) per model for serializing raw motor documents.
+# Factory defaults (id, timestamps) resolve to None; timestamps then fall back to
+# the current time exactly like a freshly hydrated model would.
+_SYNC_FIELD_DEFAULTS = {
+    model: tuple(
+        (name, info.alias or name, None if info.default_factory else info.default)
+        for name, info in model.model_fields.items()
+        if name in _SYNC_FIELDS[model] and not info.exclude
+    )
+    for model in (Patient, ClinicalNote)
+}
+
+
+def to_sync_timestamp(field: str, value: Any, current_time_ms: int) -> int:
+    """
+    Convert a stored created_at/updated_at value to milliseconds for WatermelonDB.
+    Handles datetime objects, ISO strings, and potentially corrupted numeric values.
+    """
+    if isinstance(value, datetime):
+        # Check if datetime is near epoch (before year 2000 = corrupt)
+        if value.year < 2000:
+            return current_time_ms
+        return int(value.timestamp() * 1000)
+    elif isinstance(value, str):
+        # ISO string format - parse and convert
+        try:
+            iso_str = value.replace('Z', '+00:00')
+            parsed_dt = datetime.fromisoformat(iso_str)
+            if parsed_dt.tzinfo is None:
+                parsed_dt = parsed_dt.replace(tzinfo=timezone.utc)
+            return int(parsed_dt.timestamp() * 1000)
+        except Exception as e:
+            logging.warning(f"[SYNC] Failed to parse {field}: {value}, error: {e}")
+            return current_time_ms
+    elif isinstance(value, (int, float)):
+        # Corrupted data: already a number, check if it's valid
+        if value < 1000000000000:  # Less than year 2001 in milliseconds
+            return current_time_ms
+        # else: already in milliseconds, keep as is
+        return value
+    # Missing, null or unknown format
+    return current_time_ms
+
 
 def serialize_document(doc, current_time_ms: Optional[int] = None) -> dict:
     """
     Serialize a document for sync response.
     Converts datetime fields to milliseconds for WatermelonDB compatibility.
-    Handles datetime objects, ISO strings, and potentially corrupted numeric values.
     """
     if current_time_ms is None:
         current_time_ms = int(datetime.now(timezone.utc).timestamp() * 1000)
 
-    doc_dict = doc.model_dump(mode='python')
-    doc_dict["id"] = str(doc.id)
+    # id is already a str field on both sync models, so it needs no conversion
+    doc_dict = doc.model_dump(mode='python', include=_SYNC_FIELDS.get(type(doc)))
 
-    for field in ['created_at', 'updated_at']:
+    for field in _TIMESTAMP_FIELDS:
         if field in doc_dict:
-            value = doc_dict[field]
+            doc_dict[field] = to_sync_timestamp(field, doc_dict[field], current_time_ms)
+
+    return doc_dict
 
-            if isinstance(value, datetime):
-                # Check if datetime is near epoch (before year 2000 = corrupt)
-                if value.year < 2000:
-                    doc_dict[field] = current_time_ms
-                else:
-                    doc_dict[field] = int(value.timestamp() * 1000)
-            elif isinstance(value, str):
-                # ISO string format from model_dump() - parse and convert
-                try:
-                    iso_str = value.replace('Z', '+00:00')
-                    parsed_dt = datetime.fromisoformat(iso_str)
-                    if parsed_dt.tzinfo is None:
-                        parsed_dt = parsed_dt.replace(tzinfo=timezone.utc)
-                    doc_dict[field] = int(parsed_dt.timestamp() * 1000)
-                except Exception as e:
-                    logging.warning(f"[SYNC] Failed to parse {field}: {value}, error: {e}")
-                    doc_dict[field] = current_time_ms
-            elif isinstance(value, (int, float)):
-                # Corrupted data: already a number, check if it's valid
-                if value < 1000000000000:  # Less than year 2001 in milliseconds
-                    doc_dict[field] = current_time_ms
-                # else: already in milliseconds, keep as is
-            elif value is None or value == 0:
-                doc_dict[field] = current_time_ms
-            else:
-                doc_dict[field] = current_time_ms
 
+def serialize_raw_document(raw: Dict[str, Any], model, current_time_ms: int) -> dict:
+    """
+    Serialize a raw motor document for sync response without hydrating the Beanie model.
+    Produces the same keys as serialize_document: missing fields get the model default.
+    """
+    doc_dict = {
+        field: raw.get(key, default)
+        for field, key, default in _SYNC_FIELD_DEFAULTS[model]
+    }
+    for field in _TIMESTAMP_FIELDS:
+        doc_dict[field] = to_sync_timestamp(field, doc_dict[field], current_time_ms)
     return doc_dict
 
 
@@ -67,6 +150,61 @@ def ensure_timezone_aware(dt: datetime) -> datetime:
     return dt
 
 
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+def encode_sync_cursor(created_at: datetime, record_id: str) -> str:
+    """
+    Encode a keyset pagination cursor as "<created_at ms>_<id>".
+    The id breaks ties between records created in the same millisecond.
+    """
+    created_at_ms = (ensure_timezone_aware(created_at) - _EPOCH) // timedelta(milliseconds=1)
+    return f"{created_at_ms}_{record_id}"
+
+
+def cursor_filter(cursor: str) -> Dict[str, Any]:
+    """
+    Build the query filter resuming after the (created_at, _id) position encoded in cursor.
+    Cursors without an id part (created_at only) are still accepted.
+    """
+    created_at_ms, _, last_id = cursor.partition("_")
+    cursor_dt = _EPOCH + timedelta(milliseconds=int(created_at_ms))
+    if not last_id:
+        return {"created_at": {"$gt": cursor_dt}}
+    return {"$or": [
+        {"created_at": {"$gt": cursor_dt}},
+        {"created_at": cursor_dt, "_id": {"$gt": last_id}}
+    ]}
+
+
+def build_pull_query(user_id: str, last_pulled_at_dt: datetime, cursor: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Build the sync query for records of a user created or updated since the last pull,
+    excluding soft-deleted ones. Shared by both collections and both pull variants.
+    """
+    changed_since_last_pull = [
+        {"created_at": {"$gt": last_pulled_at_dt}},
+        {"updated_at": {"$gt": last_pulled_at_dt}}
+    ]
+    query = {"user_id": user_id, "deleted_at": None}
+    if cursor:
+        query["$and"] = [{"$or": changed_since_last_pull}, cursor_filter(cursor)]
+    else:
+        query["$or"] = changed_since_last_pull
+    return query
+
+
+def build_keyset_pull_query(user_id: str, last_pulled_at_dt: datetime, cursor: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Build the batched pull query: build_pull_query restricted to records whose created_at
+    is a date. Only those have a position in the (created_at, _id) keyset order; records
+    with a missing or corrupt created_at are fetched by fetch_untimestamped_changes.
+    """
+    query = build_pull_query(user_id, last_pulled_at_dt, cursor)
+    query["created_at"] = {"$type": "date"}
+    return query
+
+
 async def get_sync_stats(user_id: str, last_pulled_at: Optional[int]) -> Dict[str, int]:
     """
     Get count of records that need to be synced.
@@ -82,27 +220,27 @@ async def get_sync_stats(user_id: str, last_pulled_at: Optional[int]) -> Dict[st
             Patient.find(
                 Patient.user_id == user_id,
                 Patient.created_at > last_pulled_at_dt,
-                {"$or": [{"deleted_at": {"$exists": False}}, {"deleted_at": None}]}
+                {"deleted_at": None}
             ).count(),
             # Count updated patients
             Patient.find(
                 Patient.user_id == user_id,
                 Patient.created_at <= last_pulled_at_dt,
                 Patient.updated_at > last_pulled_at_dt,
-                {"$or": [{"deleted_at": {"$exists": False}}, {"deleted_at": None}]}
+                {"deleted_at": None}
             ).count(),
             # Count created notes
             ClinicalNote.find(
                 ClinicalNote.user_id == user_id,
                 ClinicalNote.created_at > last_pulled_at_dt,
-                {"$or": [{"deleted_at": {"$exists": False}}, {"deleted_at": None}]}
+                {"deleted_at": None}
             ).count(),
             # Count updated notes
             ClinicalNote.find(
                 ClinicalNote.user_id == user_id,
                 ClinicalNote.created_at <= last_pulled_at_dt,
                 ClinicalNote.updated_at > last_pulled_at_dt,
-                {"$or": [{"deleted_at": {"$exists": False}}, {"deleted_at": None}]}
+                {"deleted_at": None}
             ).count()
         )
 
@@ -127,21 +265,15 @@ async def get_deleted_records(user_id: str, last_pulled_at_dt: datetime) -> Dict
     deleted_notes = []
 
     try:
-        # Find soft-deleted patients (deleted_at is set and after last pull)
-        deleted_patients_cursor = Patient.find(
-            Patient.user_id == user_id,
-            {"deleted_at": {"$exists": True, "$ne": None, "$gt": last_pulled_at_dt}}
-        )
-        async for patient in deleted_patients_cursor:
-            deleted_patients.append(str(patient.id))
-
-        # Find soft-deleted clinical notes
-        deleted_notes_cursor = ClinicalNote.find(
-            ClinicalNote.user_id == user_id,
-            {"deleted_at": {"$exists": True, "$ne": None, "$gt": last_pulled_at_dt}}
+        # Raw motor queries projecting only _id: ids come back as plain dicts without
+        # hydrating a model per record. $gt on a date never matches null deleted_at.
+        deleted_since_last_pull = {"user_id": user_id, "deleted_at": {"$gt": last_pulled_at_dt}}
+        patient_docs, note_docs = await asyncio.gather(
+            Patient.get_motor_collection().find(deleted_since_last_pull, {"_id": 1}).to_list(length=None),
+            ClinicalNote.get_motor_collection().find(deleted_since_last_pull, {"_id": 1}).to_list(length=None)
         )
-        async for note in deleted_notes_cursor:
-            deleted_notes.append(str(note.id))
+        deleted_patients = [doc["_id"] for doc in patient_docs]
+        deleted_notes = [doc["_id"] for doc in note_docs]
 
     except Exception as e:
         logging.warning(f"[SYNC] Error fetching deleted records: {e}")
@@ -157,10 +289,7 @@ async def pull_changes_batched(
     user_id: str,
     batch_size: int = DEFAULT_BATCH_SIZE,
     cursor_patient: Optional[str] = None,
-    cursor_note: Optional[str] = None,
-    # Legacy skip-based parameters (deprecated, kept for backward compatibility)
-    skip_patients: int = 0,
-    skip_notes: int = 0
+    cursor_note: Optional[str] = None
 ) -> Dict[str, Any]:
     """
     Fetches changes in batches for more efficient sync of large datasets.
@@ -170,10 +299,8 @@ async def pull_changes_batched(
         last_pulled_at: Timestamp in milliseconds of last pull
         user_id: User ID for filtering
         batch_size: Number of records per batch
-        cursor_patient: Last patient created_at timestamp for cursor-based pagination
-        cursor_note: Last note created_at timestamp for cursor-based pagination
-        skip_patients: (Deprecated) Legacy skip-based offset for patients
-        skip_notes: (Deprecated) Legacy skip-based offset for notes
+        cursor_patient: Keyset cursor ("<created_at ms>_<id>") of the last patient received
+        cursor_note: Keyset cursor ("<created_at ms>_<id>") of the last note received
 
     Returns has_more flag and cursors for next batch.
     """
@@ -183,102 +310,63 @@ async def pull_changes_batched(
     try:
         last_pulled_at_dt = datetime.fromtimestamp(last_pulled_at / 1000.0, tz=timezone.utc) if last_pulled_at else datetime.min.replace(tzinfo=timezone.utc)
 
-        # Build patient query with cursor-based pagination (more efficient than skip)
-        patient_base_query = {
-            "$and": [
-                {"user_id": user_id},
-                {"$or": [
-                    {"created_at": {"$gt": last_pulled_at_dt}},
-                    {"$and": [{"created_at": {"$lte": last_pulled_at_dt}}, {"updated_at": {"$gt": last_pulled_at_dt}}]}
-                ]},
-                {"$or": [{"deleted_at": {"$exists": False}}, {"deleted_at": None}]}
-            ]
-        }
-
-        # Add cursor filter for efficient pagination (O(1) vs O(n) for skip)
-        if cursor_patient:
-            cursor_dt = datetime.fromtimestamp(int(cursor_patient) / 1000.0, tz=timezone.utc)
-            patient_base_query["$and"].append({"created_at": {"$gt": cursor_dt}})
-
-        # Build note query with cursor-based pagination
-        note_base_query = {
-            "$and": [
-                {"user_id": user_id},
-                {"$or": [
-                    {"created_at": {"$gt": last_pulled_at_dt}},
-                    {"$and": [{"created_at": {"$lte": last_pulled_at_dt}}, {"updated_at": {"$gt": last_pulled_at_dt}}]}
-                ]},
-                {"$or": [{"deleted_at": {"$exists": False}}, {"deleted_at": None}]}
-            ]
-        }
-
-        if cursor_note:
-            cursor_dt = datetime.fromtimestamp(int(cursor_note) / 1000.0, tz=timezone.utc)
-            note_base_query["$and"].append({"created_at": {"$gt": cursor_dt}})
+        # Keyset cursor filters replace skip: O(log n) index seek instead of walking N documents
+        patient_base_query = build_keyset_pull_query(user_id, last_pulled_at_dt, cursor_patient)
+        note_base_query = build_keyset_pull_query(user_id, last_pulled_at_dt, cursor_note)
 
-        # Execute queries in parallel for better performance
-        patients_task = Patient.find(patient_base_query).sort("+created_at").limit(batch_size + 1).to_list()
-        notes_task = ClinicalNote.find(note_base_query).sort("+created_at").limit(batch_size + 1).to_list()
+        # Each collection is fetched and serialized in its own coroutine, so one collection's
+        # documents are serialized while the other's query is still in flight
+        patients_task = fetch_sync_batch(Patient, patient_base_query, batch_size, last_pulled_at_dt, current_time_ms)
+        notes_task = fetch_sync_batch(ClinicalNote, note_base_query, batch_size, last_pulled_at_dt, current_time_ms)
 
-        # Fetch deleted records only on first batch
-        is_first_batch = not cursor_patient and not cursor_note and skip_patients == 0 and skip_notes == 0
+        # Fetch deleted records and records without a keyset position only on first batch
+        is_first_batch = cursor_patient is None and cursor_note is None
         if is_first_batch:
-            patients, notes, deleted_records = await asyncio.gather(
+            patient_batch, note_batch, deleted_records, untimestamped_patients, untimestamped_notes = await asyncio.gather(
                 patients_task,
                 notes_task,
-                get_deleted_records(user_id, last_pulled_at_dt)
+                get_deleted_records(user_id, last_pulled_at_dt),
+                fetch_untimestamped_changes(Patient, user_id, last_pulled_at_dt, current_time_ms),
+                fetch_untimestamped_changes(ClinicalNote, user_id, last_pulled_at_dt, current_time_ms)
             )
         else:
-            patients, notes = await asyncio.gather(patients_task, notes_task)
+            patient_batch, note_batch = await asyncio.gather(patients_task, notes_task)
             deleted_records = {"patients": [], "clinical_notes": []}
-
-        # Determine if there are more records
-        has_more_patients = len(patients) > batch_size
-        has_more_notes = len(notes) > batch_size
-
-        if has_more_patients:
-            patients = patients[:batch_size]
-        if has_more_notes:
-            notes = notes[:batch_size]
-
-        # Get cursors for next batch (use the last record's created_at)
+            untimestamped_patients = untimestamped_notes = ([], [])
+
+        created_patients, updated_patients, has_more_patients, last_patient_cursor = patient_batch
+        created_notes, updated_notes, has_more_notes, last_note_cursor = note_batch
+        created_patients = untimestamped_patients[0] + created_patients
+        updated_patients = untimestamped_patients[1] + updated_patients
+        created_notes = untimestamped_notes[0] + created_notes
+        updated_notes = untimestamped_notes[1] + updated_notes
+
+        # Get cursors for next batch (position of the last record returned).
+        # A collection that is already exhausted keeps its cursor so it is not re-sent
+        # while the other collection still has more pages.
         next_cursor_patient = None
         next_cursor_note = None
 
-        if has_more_patients and patients:
-            last_patient = patients[-1]
-            next_cursor_patient = str(int(ensure_timezone_aware(last_patient.created_at).timestamp() * 1000))
-
-        if has_more_notes and notes:
-            last_note = notes[-1]
-            next_cursor_note = str(int(ensure_timezone_aware(last_note.created_at).timestamp() * 1000))
-
-        # Separate into created/updated
-        created_patients = [p for p in patients if ensure_timezone_aware(p.created_at) > last_pulled_at_dt]
-        updated_patients = [p for p in patients if ensure_timezone_aware(p.created_at) <= last_pulled_at_dt]
-        created_notes = [n for n in notes if ensure_timezone_aware(n.created_at) > last_pulled_at_dt]
-        updated_notes = [n for n in notes if ensure_timezone_aware(n.created_at) <= last_pulled_at_dt]
+        if has_more_patients or has_more_notes:
+            next_cursor_patient = last_patient_cursor or cursor_patient
+            next_cursor_note = last_note_cursor or cursor_note
 
         return {
             "changes": {
                 "patients": {
-                    "created": [serialize_document(p, current_time_ms) for p in created_patients],
-                    "updated": [serialize_document(p, current_time_ms) for p in updated_patients],
+                    "created": created_patients,
+                    "updated": updated_patients,
                     "deleted": deleted_records["patients"]
                 },
                 "clinical_notes": {
-                    "created": [serialize_document(n, current_time_ms) for n in created_notes],
-                    "updated": [serialize_document(n, current_time_ms) for n in updated_notes],
+                    "created": created_notes,
+                    "updated": updated_notes,
                     "deleted": deleted_records["clinical_notes"]
                 }
             },
             "has_more": has_more_patients or has_more_notes,
-            # Cursor-based pagination (preferred)
             "cursor_patient": next_cursor_patient,
             "cursor_note": next_cursor_note,
-            # Legacy skip-based pagination (deprecated, kept for backward compatibility)
-            "next_skip_patients": skip_patients + len(patients) if has_more_patients else 0,
-            "next_skip_notes": skip_notes + len(notes) if has_more_notes else 0,
             "timestamp": current_time_ms
         }
     except Exception as e:
@@ -286,10 +374,90 @@ async def pull_changes_batched(
         raise e
 
 
+def _is_created_since(raw: Dict[str, Any], last_pulled_at_dt: datetime) -> bool:
+    created_at = raw.get("created_at")
+    if not isinstance(created_at, datetime):
+        # A hydrated model would default a missing created_at to now
+        return True
+    if created_at.tzinfo is None:
+        created_at = created_at.replace(tzinfo=timezone.utc)
+    return created_at > last_pulled_at_dt
+
+
+async def stream_changes(
+    model,
+    query: Dict[str, Any],
+    last_pulled_at_dt: datetime,
+    current_time_ms: int
+) -> Tuple[List[dict], List[dict], int]:
+    """
+    Iterate the raw motor cursor and serialize each document as it arrives, partitioned
+    into (created, updated). Documents are never hydrated into Beanie models and only
+    one raw document is alive at a time. Also returns the number of documents read.
+    """
+    created = []
+    updated = []
+    count = 0
+    async for raw in model.get_motor_collection().find(query).limit(MAX_SYNC_RECORDS):
+        count += 1
+        target = created if _is_created_since(raw, last_pulled_at_dt) else updated
+        target.append(serialize_raw_document(raw, model, current_time_ms))
+    return created, updated, count
+
+
+async def fetch_untimestamped_changes(
+    model,
+    user_id: str,
+    last_pulled_at_dt: datetime,
+    current_time_ms: int
+) -> Tuple[List[dict], List[dict]]:
+    """
+    Fetch changed records whose created_at is missing or not a date (corrupt data).
+    They cannot be paged by keyset cursor, so the batched pull sends all of them
+    (up to MAX_SYNC_RECORDS) with its first batch, as (created, updated).
+    """
+    query = build_pull_query(user_id, last_pulled_at_dt)
+    query["created_at"] = {"$not": {"$type": "date"}}
+    created, updated, _ = await stream_changes(model, query, last_pulled_at_dt, current_time_ms)
+    return created, updated
+
+
+async def fetch_sync_batch(
+    model,
+    query: Dict[str, Any],
+    batch_size: int,
+    last_pulled_at_dt: datetime,
+    current_time_ms: int
+) -> Tuple[List[dict], List[dict], bool, Optional[str]]:
+    """
+    Fetch one keyset page in (created_at, _id) order and serialize it as it streams in.
+    Returns (created, updated, has_more, cursor of the last record returned).
+    """
+    created = []
+    updated = []
+    has_more = False
+    last_raw = None
+    count = 0
+    # One extra record is requested to detect whether another page exists
+    cursor = model.get_motor_collection().find(query).sort([("created_at", 1), ("_id", 1)]).limit(batch_size + 1)
+    async for raw in cursor:
+        count += 1
+        if count > batch_size:
+            has_more = True
+            break
+        last_raw = raw
+        target = created if _is_created_since(raw, last_pulled_at_dt) else updated
+        target.append(serialize_raw_document(raw, model, current_time_ms))
+    # The keyset query only matches date created_at values (build_keyset_pull_query)
+    next_cursor = encode_sync_cursor(last_raw["created_at"], last_raw["_id"]) if last_raw else None
+    return created, updated, has_more, next_cursor
+
+
 async def pull_changes(last_pulled_at: int, user_id: str) -> Dict[str, Any]:
     """
     Fetches changes from the database since the last pull time.
-    Uses asyncio.gather() for parallel query execution and extracted serialization.
+    Uses asyncio.gather() for parallel query execution and streams each cursor
+    through serialization so full model lists are never held in memory.
     """
     import time
     start_time = time.time()
@@ -299,73 +467,49 @@ async def pull_changes(last_pulled_at: int, user_id: str) -> Dict[str, Any]:
         last_pulled_at_dt = datetime.fromtimestamp(last_pulled_at / 1000.0, tz=timezone.utc) if last_pulled_at else datetime.min.replace(tzinfo=timezone.utc)
         current_time_ms = int(datetime.now(timezone.utc).timestamp() * 1000)
 
-        # Execute all queries in parallel for better performance
-        created_patients, updated_patients, created_notes, updated_notes, deleted_records = await asyncio.gather(
-            # Fetch created patients (created AFTER last pull, excluding soft-deleted)
-            Patient.find(
-                Patient.user_id == user_id,
-                Patient.created_at > last_pulled_at_dt,
-                {"$or": [{"deleted_at": {"$exists": False}}, {"deleted_at": None}]}
-            ).limit(MAX_SYNC_RECORDS).to_list(),
-
-            # Fetch updated patients (created BEFORE last pull, but updated AFTER, excluding soft-deleted)
-            Patient.find(
-                Patient.user_id == user_id,
-                Patient.created_at <= last_pulled_at_dt,
-                Patient.updated_at > last_pulled_at_dt,
-                {"$or": [{"deleted_at": {"$exists": False}}, {"deleted_at": None}]}
-            ).limit(MAX_SYNC_RECORDS).to_list(),
-
-            # Fetch created notes
-            ClinicalNote.find(
-                ClinicalNote.user_id == user_id,
-                ClinicalNote.created_at > last_pulled_at_dt,
-                {"$or": [{"deleted_at": {"$exists": False}}, {"deleted_at": None}]}
-            ).limit(MAX_SYNC_RECORDS).to_list(),
-
-            # Fetch updated notes
-            ClinicalNote.find(
-                ClinicalNote.user_id == user_id,
-                ClinicalNote.created_at <= last_pulled_at_dt,
-                ClinicalNote.updated_at > last_pulled_at_dt,
-                {"$or": [{"deleted_at": {"$exists": False}}, {"deleted_at": None}]}
-            ).limit(MAX_SYNC_RECORDS).to_list(),
+        # One query per collection: created OR updated since last pull, excluding soft-deleted.
+        # Created vs updated is split in Python, halving round-trips versus separate queries.
+        changed_since_last_pull = build_pull_query(user_id, last_pulled_at_dt)
 
-            # Fetch deleted records
+        # Execute all queries in parallel, serializing documents as the cursors yield them
+        patient_changes, note_changes, deleted_records = await asyncio.gather(
+            stream_changes(Patient, changed_since_last_pull, last_pulled_at_dt, current_time_ms),
+            stream_changes(ClinicalNote, changed_since_last_pull, last_pulled_at_dt, current_time_ms),
             get_deleted_records(user_id, last_pulled_at_dt)
         )
+        created_patients, updated_patients, patient_count = patient_changes
+        created_notes, updated_notes, note_count = note_changes
 
         # Log warning if any limits were reached
-        if len(created_patients) == MAX_SYNC_RECORDS or len(updated_patients) == MAX_SYNC_RECORDS:
+        if patient_count == MAX_SYNC_RECORDS:
             logging.warning(f"[SYNC] User {user_id} hit sync limit ({MAX_SYNC_RECORDS}) for patients - consider incremental sync")
-        if len(created_notes) == MAX_SYNC_RECORDS or len(updated_notes) == MAX_SYNC_RECORDS:
+        if note_count == MAX_SYNC_RECORDS:
             logging.warning(f"[SYNC] User {user_id} hit sync limit ({MAX_SYNC_RECORDS}) for notes - consider incremental sync")
 
         # Calculate metrics
         duration_ms = int((time.time() - start_time) * 1000)
         records_synced = (
-            len(created_patients) + len(updated_patients) +
-            len(created_notes) + len(updated_notes) +
+            patient_count + note_count +
             len(deleted_records["patients"]) + len(deleted_records["clinical_notes"])
         )
 
-        await SyncEvent(
+        record_sync_event(SyncEvent(
             user_id=user_id,
             success=True,
             duration_ms=duration_ms,
             records_synced=records_synced,
             sync_mode="pull"
-        ).insert()
+        ))
 
         return {
             "patients": {
-                "created": [serialize_document(p, current_time_ms) for p in created_patients],
-                "updated": [serialize_document(p, current_time_ms) for p in updated_patients],
+                "created": created_patients,
+                "updated": updated_patients,
                 "deleted": deleted_records["patients"]
             },
             "clinical_notes": {
-                "created": [serialize_document(n, current_time_ms) for n in created_notes],
-                "updated": [serialize_document(n, current_time_ms) for n in updated_notes],
+                "created": created_notes,
+                "updated": updated_notes,
                 "deleted": deleted_records["clinical_notes"]
             }
         }
@@ -391,6 +535,9 @@ async def push_changes(changes: Dict[str, Dict[str, List[Dict[str, Any]]]], user
     records_processed = 0
 
     try:
+        # Single server timestamp for this push (defaults, updated_at stamps and soft deletes)
+        current_time = datetime.now(timezone.utc)
+
         # Helper function to sanitize patient data
         def sanitize_patient_data(data: dict) -> dict:
             """Convert empty strings to None for optional email field"""
@@ -402,33 +549,72 @@ async def push_changes(changes: Dict[str, Dict[str, List[Dict[str, Any]]]], user
         def convert_timestamps(data: dict) -> dict:
             """Convert milliseconds timestamps from WatermelonDB to datetime objects.
             Handles missing, null, and zero values by setting current time."""
-            current_time = datetime.now(timezone.utc)
-            
-            for field in ['created_at', 'updated_at']:
+            for field in ('created_at', 'updated_at'):
                 value = data.get(field)
-                
-                if value is None or value == 0 or value == '':
-                    # Missing or invalid - set to current time
-                    data[field] = current_time
-                elif isinstance(value, (int, float)):
-                    # Valid milliseconds timestamp
-                    if value < 1000000000000:  # Less than year ~2001 in ms (likely seconds or corrupt)
-                        data[field] = current_time
-                    else:
+                value_type = type(value)
+
+                if value_type is int or value_type is float:
+                    # Common case: WatermelonDB milliseconds timestamp.
+                    # Less than year ~2001 in ms (zero, seconds or corrupt) falls back to current time
+                    if value >= 1000000000000:
                         data[field] = datetime.fromtimestamp(value / 1000.0, tz=timezone.utc)
-                elif isinstance(value, datetime):
+                    else:
+                        data[field] = current_time
+                elif value_type is datetime or isinstance(value, datetime):
                     # Already a datetime, keep as is
                     pass
                 else:
-                    # Unknown format - set to current time
+                    # Missing, null, empty or unknown format - set to current time
                     data[field] = current_time
-                    
+
             return data
 
-        # Process created records (bulk insert)
-        if 'patients' in changes and 'created' in changes['patients']:
+        # Extract and validate all patient updates before anything is written
+        patient_updates = []
+        for patient_data in changes.get('patients', {}).get('updated', []):
+            patient_id = patient_data.pop('id', None)
+            if not patient_id:
+                raise ValueError("Missing 'id' field in patient update data")
+            if 'updated_at' not in patient_data:
+                raise ValueError(f"Missing 'updated_at' field in patient update data for {patient_id}")
+            # Convert timestamps from milliseconds to datetime for updated records
+            patient_data = convert_timestamps(patient_data)
+            patient_updates.append((patient_id, sanitize_patient_data(patient_data)))
+
+        # Conflicts are detected up front so a conflicting push is rejected as a whole
+        # instead of being partly applied. Only owned records are fetched, and only the
+        # fields the check needs.
+        if patient_updates:
+            existing_patients = await Patient.get_motor_collection().find(
+                {"_id": {"$in": [pid for pid, _ in patient_updates]}, "user_id": user_id},
+                {"updated_at": 1}
+            ).to_list(length=None)
+            server_updated_at_by_id = {p["_id"]: p.get("updated_at") for p in existing_patients}
+
+            stale_ids = []
+            for patient_id, patient_data in patient_updates:
+                server_updated_at = server_updated_at_by_id.get(patient_id)
+                # Missing (not owned) records are skipped by the write; legacy rows whose
+                # updated_at is not a date cannot be newer than the client
+                if not isinstance(server_updated_at, datetime):
+                    continue
+                if server_updated_at.tzinfo is None:
+                    server_updated_at = server_updated_at.replace(tzinfo=timezone.utc)
+                # client updated_at is already converted to datetime by convert_timestamps
+                if patient_data['updated_at'] < server_updated_at:
+                    stale_ids.append(patient_id)
+            if stale_ids:
+                conflict_count += len(stale_ids)
+                raise SyncConflictException(f"Conflict detected for patient(s) {', '.join(stale_ids)}")
+
+        # Each collection is applied as its own pipeline (create -> update -> delete) so ordering
+        # within a collection is preserved while the two collections are written concurrently.
+        async def apply_patient_changes(patient_changes: Dict[str, List[Dict[str, Any]]]) -> None:
+            nonlocal conflict_count
+
+            # Process created records (bulk insert)
             patients_to_create = []
-            for patient_data in changes['patients']['created']:
+            for patient_data in patient_changes.get('created', []):
                 patient_data['user_id'] = user_id
                 patient_data = sanitize_patient_data(patient_data)
                 patient_data = convert_timestamps(patient_data)
@@ -436,66 +622,64 @@ async def push_changes(changes: Dict[str, Dict[str, List[Dict[str, Any]]]], user
             if patients_to_create:
                 await Patient.insert_many(patients_to_create)
 
-        if 'clinical_notes' in changes and 'created' in changes['clinical_notes']:
+            # Process updated records with bulk writes (validated and conflict-checked above)
+            if patient_updates:
+                # The filter still guards ownership and staleness against writes that landed
+                # after the conflict check; rows with a non-date updated_at always match.
+                patient_ops = []
+                for patient_id, patient_data in patient_updates:
+                    client_updated_at = patient_data['updated_at']
+                    patient_data['updated_at'] = current_time
+                    patient_ops.append(UpdateOne(
+                        {
+                            "_id": patient_id,
+                            "user_id": user_id,
+                            "$or": [
+                                {"updated_at": {"$lte": client_updated_at}},
+                                {"updated_at": {"$not": {"$type": "date"}}}
+                            ]
+                        },
+                        {"$set": patient_data}
+                    ))
+
+                result = await Patient.get_motor_collection().bulk_write(patient_ops, ordered=False)
+
+                skipped_count = len(patient_ops) - result.matched_count
+                if skipped_count:
+                    # Unmatched records are missing/not owned, or were changed by a concurrent
+                    # push after the check. The rest of the batch is already applied, so this is
+                    # not raised; the client receives the newer server copy on its next pull.
+                    concurrent_count = len(server_updated_at_by_id) - result.matched_count
+                    if concurrent_count > 0:
+                        conflict_count += concurrent_count
+                        logging.warning(f"[SYNC] {concurrent_count} patient(s) changed concurrently for user {user_id}; kept the server copy")
+                    logging.debug(f"[SYNC] {skipped_count} patient(s) not applied for user {user_id} during sync update")
+
+            # Process deleted records with soft delete (mark as deleted instead of removing)
+            # This allows deleted records to be synced to other clients
+            # Record ids are UUID strings stored as-is in _id (not ObjectIds), so they are only
+            # de-duplicated once here and passed straight to the driver
+            patient_ids_to_delete = list(dict.fromkeys(patient_changes.get('deleted') or ()))
+            if patient_ids_to_delete:
+                # Soft delete: set deleted_at timestamp instead of removing
+                await Patient.find(
+                    {"_id": {"$in": patient_ids_to_delete}, "user_id": user_id}
+                ).update_many({"$set": {"deleted_at": current_time}})
+
+        async def apply_note_changes(note_changes: Dict[str, List[Dict[str, Any]]]) -> None:
+            # Process created records (bulk insert)
             notes_to_create = []
-            for note_data in changes['clinical_notes']['created']:
+            for note_data in note_changes.get('created', []):
                 note_data['user_id'] = user_id
                 note_data = convert_timestamps(note_data)
                 notes_to_create.append(ClinicalNote(**note_data))
             if notes_to_create:
                 await ClinicalNote.insert_many(notes_to_create)
 
-        # Process updated records with batch fetch
-        if 'patients' in changes and 'updated' in changes['patients']:
-            # Extract and validate all patient IDs first
-            patient_updates = []
-            for patient_data in changes['patients']['updated']:
-                patient_id = patient_data.pop('id', None)
-                if not patient_id:
-                    raise ValueError("Missing 'id' field in patient update data")
-                if 'updated_at' not in patient_data:
-                    raise ValueError(f"Missing 'updated_at' field in patient update data for {patient_id}")
-                # Convert timestamps from milliseconds to datetime for updated records
-                patient_data = convert_timestamps(patient_data)
-                patient_updates.append((patient_id, sanitize_patient_data(patient_data)))
-
-            if patient_updates:
-                # Batch fetch all patients at once
-                patient_ids = [pid for pid, _ in patient_updates]
-                existing_patients = await Patient.find(
-                    {"_id": {"$in": patient_ids}, "user_id": user_id}
-                ).to_list()
-                patients_by_id = {str(p.id): p for p in existing_patients}
-
-                # Process updates with ownership validation
-                for patient_id, patient_data in patient_updates:
-                    patient = patients_by_id.get(patient_id)
-                    if patient:
-                        # SECURITY: Defense-in-depth ownership validation
-                        # The batch query above already filters by user_id, but we verify again
-                        if str(patient.user_id) != str(user_id):
-                            logging.warning(f"[SYNC] Ownership violation attempt: user {user_id} tried to update patient {patient_id}")
-                            continue  # Skip this patient silently
-
-                        # client_updated_at is already converted to datetime by convert_timestamps
-                        client_updated_at = patient_data['updated_at']
-                        if not isinstance(client_updated_at, datetime):
-                            # Fallback if somehow not converted
-                            client_updated_at = datetime.fromtimestamp(client_updated_at / 1000.0, tz=timezone.utc)
-                        server_updated_at = patient.updated_at.astimezone(timezone.utc) if patient.updated_at.tzinfo else patient.updated_at.replace(tzinfo=timezone.utc)
-                        if client_updated_at < server_updated_at:
-                            conflict_count += 1
-                            raise SyncConflictException(f"Conflict detected for patient {patient_id}")
-                        patient_data['updated_at'] = datetime.now(timezone.utc)
-                        await patient.update({"$set": patient_data})
-                    else:
-                        # Patient not found - could be deleted or ownership mismatch
-                        logging.debug(f"[SYNC] Patient {patient_id} not found for user {user_id} during sync update")
-
-        if 'clinical_notes' in changes and 'updated' in changes['clinical_notes']:
+            # Process updated records with bulk writes
             # Extract and validate all note IDs first
             note_updates = []
-            for note_data in changes['clinical_notes']['updated']:
+            for note_data in note_changes.get('updated', []):
                 note_id = note_data.pop('id', None)
                 if not note_id:
                     raise ValueError("Missing 'id' field in clinical note update data")
@@ -504,48 +688,43 @@ async def push_changes(changes: Dict[str, Dict[str, List[Dict[str, Any]]]], user
                 note_updates.append((note_id, note_data))
 
             if note_updates:
-                # Batch fetch all notes at once
-                note_ids = [nid for nid, _ in note_updates]
-                existing_notes = await ClinicalNote.find(
-                    {"_id": {"$in": note_ids}, "user_id": user_id}
-                ).to_list()
-                notes_by_id = {str(n.id): n for n in existing_notes}
-
-                # Process updates with ownership validation
+                # Ownership is enforced by the update filter; records of other users never match
+                note_ops = []
                 for note_id, note_data in note_updates:
-                    note = notes_by_id.get(note_id)
-                    if note:
-                        # SECURITY: Defense-in-depth ownership validation
-                        if str(note.user_id) != str(user_id):
-                            logging.warning(f"[SYNC] Ownership violation attempt: user {user_id} tried to update note {note_id}")
-                            continue  # Skip this note silently
-
-                        note_data['updated_at'] = datetime.now(timezone.utc)
-                        await note.update({"$set": note_data})
-                    else:
-                        # Note not found - could be deleted or ownership mismatch
-                        logging.debug(f"[SYNC] Note {note_id} not found for user {user_id} during sync update")
+                    note_data['updated_at'] = current_time
+                    note_ops.append(UpdateOne({"_id": note_id, "user_id": user_id}, {"$set": note_data}))
 
-        # Process deleted records with soft delete (mark as deleted instead of removing)
-        # This allows deleted records to be synced to other clients
-        if 'patients' in changes and 'deleted' in changes['patients']:
-            patient_ids_to_delete = changes['patients']['deleted']
-            if patient_ids_to_delete:
-                # Soft delete: set deleted_at timestamp instead of removing
-                current_time = datetime.now(timezone.utc)
-                await Patient.find(
-                    {"_id": {"$in": patient_ids_to_delete}, "user_id": user_id}
-                ).update_many({"$set": {"deleted_at": current_time}})
+                result = await ClinicalNote.get_motor_collection().bulk_write(note_ops, ordered=False)
+                if result.matched_count < len(note_ops):
+                    # Note not found - could be deleted or ownership mismatch
+                    logging.debug(f"[SYNC] {len(note_ops) - result.matched_count} note(s) not found for user {user_id} during sync update")
 
-        if 'clinical_notes' in changes and 'deleted' in changes['clinical_notes']:
-            note_ids_to_delete = changes['clinical_notes']['deleted']
+            # Process deleted records with soft delete
+            note_ids_to_delete = list(dict.fromkeys(note_changes.get('deleted') or ()))
             if note_ids_to_delete:
                 # Soft delete: set deleted_at timestamp instead of removing
-                current_time = datetime.now(timezone.utc)
                 await ClinicalNote.find(
                     {"_id": {"$in": note_ids_to_delete}, "user_id": user_id}
                 ).update_many({"$set": {"deleted_at": current_time}})
-                records_processed += len(note_ids_to_delete)
+
+        pipelines = []
+        if 'patients' in changes:
+            pipelines.append(asyncio.create_task(apply_patient_changes(changes['patients'])))
+        if 'clinical_notes' in changes:
+            pipelines.append(asyncio.create_task(apply_note_changes(changes['clinical_notes'])))
+        if pipelines:
+            # A failure propagates as-is (not as an ExceptionGroup, so the API still maps
+            # it), but only after the other pipeline is cancelled and awaited: nothing keeps
+            # writing once the request has failed, and its own errors are not left unobserved.
+            try:
+                await asyncio.wait(pipelines, return_when=asyncio.FIRST_EXCEPTION)
+            finally:
+                for task in pipelines:
+                    task.cancel()
+                results = await asyncio.gather(*pipelines, return_exceptions=True)
+            errors = [r for r in results if isinstance(r, Exception)]
+            if errors:
+                raise errors[0]
 
         # Count total records processed
         if 'patients' in changes:
@@ -555,16 +734,17 @@ async def push_changes(changes: Dict[str, Dict[str, List[Dict[str, Any]]]], user
         if 'clinical_notes' in changes:
             records_processed += len(changes['clinical_notes'].get('created', []))
             records_processed += len(changes['clinical_notes'].get('updated', []))
+            records_processed += len(changes['clinical_notes'].get('deleted', []))
 
         duration_ms = int((time.time() - start_time) * 1000)
-        await SyncEvent(
+        record_sync_event(SyncEvent(
             user_id=user_id,
             success=True,
             duration_ms=duration_ms,
             records_synced=records_processed,
             conflict_count=conflict_count,
             sync_mode="push"
-        ).insert()
+        ))
     except Exception as e:
         duration_ms = int((time.time() - start_time) * 1000)
         await SyncEvent(
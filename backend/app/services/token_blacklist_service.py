@@ -9,8 +9,11 @@ Usage:
     - Call `is_token_blacklisted(jti)` in authentication middleware
 """
 from datetime import datetime, timezone
-from typing import Dict, Optional
+from typing import Dict, List, Optional, Tuple
 import asyncio
+import heapq
+import socket
+import time
 from redis import asyncio as aioredis
 
 from app.core.logger import get_logger
@@ -18,23 +21,84 @@ from app.core.config import settings
 
 logger = get_logger(__name__)
 
+# Local cache of "not blacklisted" answers in front of Redis.
+# Entries are evicted across instances via pub/sub; the TTL bounds staleness if a message is missed.
+NEGATIVE_CACHE_TTL_SECONDS = 30
+NEGATIVE_CACHE_MAX_SIZE = 100_000
+INVALIDATION_CHANNEL = "token_blacklist_events"
+
+# Redis connection pool: bounded size, periodic health checks and TCP keepalive so idle
+# connections are not silently dropped by firewalls and reconnected on the auth path
+REDIS_MAX_CONNECTIONS = 64
+REDIS_HEALTH_CHECK_INTERVAL = 30  # seconds
+REDIS_KEEPALIVE_OPTIONS = {socket.TCP_KEEPIDLE: 60} if hasattr(socket, "TCP_KEEPIDLE") else {}
+
+# Sets the user invalidation marker only if it moves forward in time, so concurrent
+# password changes can never replace a later cutoff with an earlier one. Markers are
+# fixed-width UTC ISO strings, so string order matches chronological order.
+# KEYS[1] = marker key, ARGV[1] = ISO timestamp, ARGV[2] = TTL seconds
+SET_USER_MARKER_LUA = """
+local current = redis.call('GET', KEYS[1])
+if current and current >= ARGV[1] then
+    return 0
+end
+redis.call('SETEX', KEYS[1], ARGV[2], ARGV[1])
+return 1
+"""
+USER_MARKER_TTL_SECONDS = 604800  # 7 days, longer than typical token lifetime
+
+# Returns 1 if the jti is blacklisted or the token was issued before the user's marker.
+# Both timestamps are UTC ISO strings with microseconds, so string order is time order.
+CHECK_TOKEN_LUA = """
+if redis.call('EXISTS', KEYS[1]) == 1 then
+    return 1
+end
+local marker = redis.call('GET', KEYS[2])
+if marker and marker > ARGV[1] then
+    return 1
+end
+return 0
+"""
+
+# Minimum interval between sweeps of expired in-memory entries
+CLEANUP_INTERVAL_SECONDS = 60
+CLEANUP_MAX_ENTRIES = 256
+
+# SCAN page size and keys per UNLINK when clearing the Redis blacklist
+CLEAR_SCAN_COUNT = 10_000
+CLEAR_UNLINK_BATCH_SIZE = 1_000
+USER_INVALIDATION_EVENT_PREFIX = "user:"
+
 
 class TokenBlacklistService:
     """
     Token blacklist with Redis backend for persistence and distributed deployments.
     Falls back to in-memory storage if Redis is unavailable.
 
-    Async-safe implementation using asyncio.Lock for concurrent access.
-    Entries are automatically removed when their corresponding token expires.
+    The in-memory fallback is lock-free: every dict operation runs between awaits on the
+    single-threaded event loop, so no coroutine can observe a partial update.
+    Expired entries are swept at most once per CLEANUP_INTERVAL_SECONDS.
     """
 
     def __init__(self):
         self._redis: Optional[aioredis.Redis] = None
-        self._blacklist: Dict[str, datetime] = {}  # In-memory fallback
-        self._lock = asyncio.Lock()
+        # In-memory fallback, as epoch seconds: jti -> expiry and user_id -> issued_before.
+        # Markers live apart from tokens so lookups skip key building and never collide with a jti
+        self._blacklist: Dict[str, float] = {}
+        self._user_markers: Dict[str, float] = {}
+        # Min-heap of (expiry, jti) for finite token expiries; user markers are not tracked
+        self._expiry_heap: List[Tuple[float, str]] = []
+        self._last_cleanup = 0.0
         self._prefix = "token_blacklist:"
         self._user_invalidation_prefix = "user_invalidated:"
         self._redis_available = False
+        self._negative_cache: Dict[str, float] = {}  # jti -> monotonic expiry
+        # Bumped on every eviction, so a check that raced one does not cache its stale answer
+        self._eviction_generation = 0
+        self._pubsub = None
+        self._listener_task: Optional[asyncio.Task] = None
+        self._set_user_marker = None
+        self._check_token = None
 
     async def initialize(self):
         """
@@ -43,21 +107,86 @@ class TokenBlacklistService:
         """
         if settings.REDIS_URL:
             try:
-                self._redis = aioredis.from_url(
+                pool = aioredis.ConnectionPool.from_url(
                     settings.REDIS_URL,
                     encoding="utf-8",
-                    decode_responses=True
+                    decode_responses=True,
+                    max_connections=REDIS_MAX_CONNECTIONS,
+                    health_check_interval=REDIS_HEALTH_CHECK_INTERVAL,
+                    socket_keepalive=True,
+                    socket_keepalive_options=REDIS_KEEPALIVE_OPTIONS
                 )
+                self._redis = aioredis.Redis(connection_pool=pool)
                 # Test connection
                 await self._redis.ping()
+                self._register_scripts()
                 self._redis_available = True
                 logger.info("redis_token_blacklist_initialized", redis_url=settings.REDIS_URL.split('@')[-1])
+                await self._start_invalidation_listener()
             except Exception as e:
                 logger.warning("redis_connection_failed_fallback_to_memory", error=str(e))
                 self._redis_available = False
         else:
             logger.info("redis_not_configured_using_memory_blacklist")
 
+    def _register_scripts(self) -> None:
+        """Register Lua scripts once; redis-py runs them by SHA and reloads on NOSCRIPT."""
+        self._set_user_marker = self._redis.register_script(SET_USER_MARKER_LUA)
+        self._check_token = self._redis.register_script(CHECK_TOKEN_LUA)
+
+    async def close(self) -> None:
+        """Stop the invalidation listener. Should be called at application shutdown."""
+        if self._listener_task:
+            self._listener_task.cancel()
+            self._listener_task = None
+        if self._pubsub:
+            try:
+                await self._pubsub.close()
+            except Exception as e:
+                logger.warning("blacklist_pubsub_close_failed", error=str(e))
+            self._pubsub = None
+
+    async def _start_invalidation_listener(self) -> None:
+        """Subscribe to blacklist events from other instances to evict negative cache entries."""
+        try:
+            self._pubsub = self._redis.pubsub(ignore_subscribe_messages=True)
+            await self._pubsub.subscribe(INVALIDATION_CHANNEL)
+            self._listener_task = asyncio.create_task(self._listen_for_invalidations())
+        except Exception as e:
+            # Without the listener, cached entries still expire after NEGATIVE_CACHE_TTL_SECONDS
+            logger.warning("blacklist_invalidation_listener_failed", error=str(e))
+
+    async def _listen_for_invalidations(self) -> None:
+        try:
+            async for message in self._pubsub.listen():
+                if message.get("type") == "message":
+                    self._evict_negative_cache(message["data"])
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning("blacklist_invalidation_listener_stopped", error=str(e))
+
+    def _evict_negative_cache(self, event: str) -> None:
+        """Evict a jti, or everything for a user invalidation event (entries are keyed by jti only)."""
+        self._eviction_generation += 1
+        if event.startswith(USER_INVALIDATION_EVENT_PREFIX):
+            self._negative_cache.clear()
+        else:
+            self._negative_cache.pop(event, None)
+
+    async def _publish_invalidation(self, event: str) -> None:
+        self._evict_negative_cache(event)
+        try:
+            await self._redis.publish(INVALIDATION_CHANNEL, event)
+        except Exception as e:
+            logger.warning("blacklist_invalidation_publish_failed", error=str(e))
+
+    def _cache_not_blacklisted(self, jti: str, now: float) -> None:
+        if len(self._negative_cache) >= NEGATIVE_CACHE_MAX_SIZE:
+            # Dicts keep insertion order: drop the oldest entry
+            self._negative_cache.pop(next(iter(self._negative_cache)))
+        self._negative_cache[jti] = now + NEGATIVE_CACHE_TTL_SECONDS
+
     async def blacklist_token(self, jti: str, exp: Optional[datetime] = None) -> None:
         """
         Add a token to the blacklist.
@@ -70,14 +199,15 @@ class TokenBlacklistService:
             try:
                 # Calculate TTL in seconds
                 if exp:
-                    ttl = int((exp - datetime.now(timezone.utc)).total_seconds())
+                    ttl = int(exp.timestamp() - time.time())
                     if ttl > 0:
-                        await self._redis.setex(f"{self._prefix}{jti}", ttl, "1")
+                        await self._redis.setex(self._prefix + jti, ttl, "1")
                         logger.info("token_blacklisted_redis", token_jti=jti, ttl=ttl)
                 else:
                     # No expiration - set with very long TTL (10 years)
-                    await self._redis.setex(f"{self._prefix}{jti}", 315360000, "1")
+                    await self._redis.setex(self._prefix + jti, 315360000, "1")
                     logger.info("token_blacklisted_redis_indefinite", token_jti=jti)
+                await self._publish_invalidation(jti)
             except Exception as e:
                 logger.error("redis_blacklist_failed_fallback", error=str(e))
                 self._redis_available = False
@@ -85,10 +215,12 @@ class TokenBlacklistService:
 
         # In-memory fallback
         if not self._redis_available:
-            async with self._lock:
-                await self._cleanup_expired()
-                self._blacklist[jti] = exp or datetime.max.replace(tzinfo=timezone.utc)
-                logger.info("token_blacklisted_memory", token_jti=jti)
+            self._cleanup_expired()
+            exp_ts = exp.timestamp() if exp else float("inf")
+            self._blacklist[jti] = exp_ts
+            if exp:
+                heapq.heappush(self._expiry_heap, (exp_ts, jti))
+            logger.info("token_blacklisted_memory", token_jti=jti)
 
     async def blacklist_user_tokens(self, user_id: str, issued_before: datetime) -> None:
         """
@@ -99,23 +231,27 @@ class TokenBlacklistService:
         Stores a marker that all tokens for this user issued before
         this timestamp should be considered invalid.
         """
-        marker_key = f"{self._user_invalidation_prefix}{user_id}"
-        timestamp_str = issued_before.isoformat()
+        marker_key = self._user_invalidation_prefix + user_id
+        # Normalized to UTC with microseconds so markers compare correctly as strings
+        timestamp_str = issued_before.astimezone(timezone.utc).isoformat(timespec="microseconds")
 
         if self._redis_available and self._redis:
             try:
-                # Store with 7 days TTL (longer than typical token lifetime)
-                await self._redis.setex(marker_key, 604800, timestamp_str)
+                # Atomic compare-and-set in one round-trip; the marker only moves forward
+                await self._set_user_marker(
+                    keys=[marker_key],
+                    args=[timestamp_str, USER_MARKER_TTL_SECONDS]
+                )
                 logger.info("user_tokens_invalidated_redis", user_id=user_id, issued_before=timestamp_str)
+                await self._publish_invalidation(f"{USER_INVALIDATION_EVENT_PREFIX}{user_id}")
             except Exception as e:
                 logger.error("redis_user_invalidation_failed_fallback", error=str(e))
                 self._redis_available = False
 
         # In-memory fallback
         if not self._redis_available:
-            async with self._lock:
-                self._blacklist[marker_key] = issued_before
-                logger.info("user_tokens_invalidated_memory", user_id=user_id, issued_before=timestamp_str)
+            self._user_markers[user_id] = max(issued_before.timestamp(), self._user_markers.get(user_id, 0.0))
+            logger.info("user_tokens_invalidated_memory", user_id=user_id, issued_before=timestamp_str)
 
     async def is_token_blacklisted(self, jti: str, user_id: Optional[str] = None,
                                     issued_at: Optional[datetime] = None) -> bool:
@@ -131,80 +267,104 @@ class TokenBlacklistService:
             True if the token should be rejected, False otherwise
         """
         if self._redis_available and self._redis:
-            try:
-                # Check direct blacklist
-                exists = await self._redis.exists(f"{self._prefix}{jti}")
-                if exists:
-                    return True
+            now = time.monotonic()
+            if self._negative_cache.get(jti, 0.0) > now:
+                return False
+            generation = self._eviction_generation
 
-                # Check user-level invalidation
+            try:
                 if user_id and issued_at:
-                    marker_key = f"{self._user_invalidation_prefix}{user_id}"
-                    timestamp_str = await self._redis.get(marker_key)
-                    if timestamp_str:
-                        invalidated_before = datetime.fromisoformat(timestamp_str)
-                        if issued_at < invalidated_before:
-                            return True
+                    # Direct blacklist and user-level invalidation are both decided inside Redis
+                    rejected = await self._check_token(
+                        keys=[self._prefix + jti, self._user_invalidation_prefix + user_id],
+                        args=[issued_at.astimezone(timezone.utc).isoformat(timespec="microseconds")]
+                    )
+                else:
+                    rejected = await self._redis.exists(self._prefix + jti)
+
+                if rejected:
+                    return True
 
+                # A revocation evicted while Redis answered may postdate that answer: don't cache it
+                if self._eviction_generation == generation:
+                    self._cache_not_blacklisted(jti, now)
                 return False
             except Exception as e:
                 logger.error("redis_check_failed_fallback", error=str(e))
                 self._redis_available = False
 
         # In-memory fallback
-        async with self._lock:
-            # Check direct blacklist
-            if jti in self._blacklist:
-                exp = self._blacklist[jti]
-                if exp > datetime.now(timezone.utc):
-                    return True
-                else:
-                    # Token has expired, remove from blacklist
-                    del self._blacklist[jti]
-
-            # Check user-level invalidation
-            if user_id and issued_at:
-                marker_key = f"{self._user_invalidation_prefix}{user_id}"
-                if marker_key in self._blacklist:
-                    invalidated_before = self._blacklist[marker_key]
-                    if issued_at < invalidated_before:
-                        return True
-
-            return False
-
-    async def _cleanup_expired(self) -> None:
-        """Remove expired entries from the in-memory blacklist. Redis handles TTL automatically."""
-        now = datetime.now(timezone.utc)
-        expired_keys = [
-            key for key, exp in self._blacklist.items()
-            if not key.startswith(self._user_invalidation_prefix) and exp <= now
-        ]
-        for key in expired_keys:
-            del self._blacklist[key]
-
-        if expired_keys:
-            logger.debug("blacklist_cleanup", expired_count=len(expired_keys))
+        # Check direct blacklist
+        exp = self._blacklist.get(jti)
+        if exp is not None:
+            if exp > time.time():
+                return True
+            # Token has expired, remove from blacklist
+            self._blacklist.pop(jti, None)
+
+        # Check user-level invalidation
+        if user_id and issued_at:
+            invalidated_before = self._user_markers.get(user_id)
+            if invalidated_before is not None and issued_at.timestamp() < invalidated_before:
+                return True
+
+        return False
+
+    def _cleanup_expired(self) -> None:
+        """
+        Remove expired entries from the in-memory blacklist, at most once per
+        CLEANUP_INTERVAL_SECONDS. Redis handles TTL automatically.
+
+        Each call pops at most CLEANUP_MAX_ENTRIES heap entries so a burst of expiries
+        never stalls a single blacklist_token call; a backlog is drained over later calls.
+        """
+        monotonic_now = time.monotonic()
+        if monotonic_now - self._last_cleanup < CLEANUP_INTERVAL_SECONDS:
+            return
+
+        # Only entries that actually expired are popped. A heap entry is stale if the jti
+        # was already removed on lookup or re-blacklisted with another expiry.
+        now = time.time()
+        expired_count = 0
+        heap = self._expiry_heap
+        for _ in range(CLEANUP_MAX_ENTRIES):
+            if not heap or heap[0][0] > now:
+                # Fully caught up: throttle until the next interval
+                self._last_cleanup = monotonic_now
+                break
+            exp_ts, jti = heapq.heappop(heap)
+            if self._blacklist.get(jti) == exp_ts:
+                del self._blacklist[jti]
+                expired_count += 1
+
+        if expired_count:
+            logger.debug("blacklist_cleanup", expired_count=expired_count)
 
     async def clear(self) -> None:
         """Clear all blacklisted tokens. Use with caution."""
         if self._redis_available and self._redis:
             try:
-                # Clear all tokens matching our prefix
-                cursor = 0
-                while True:
-                    cursor, keys = await self._redis.scan(cursor, match=f"{self._prefix}*", count=100)
-                    if keys:
-                        await self._redis.delete(*keys)
-                    if cursor == 0:
-                        break
+                # Clear all tokens matching our prefix. Large SCAN pages cut round-trips and
+                # UNLINK frees memory in the background instead of blocking Redis like DEL
+                batch = []
+                async for key in self._redis.scan_iter(match=f"{self._prefix}*", count=CLEAR_SCAN_COUNT):
+                    batch.append(key)
+                    if len(batch) >= CLEAR_UNLINK_BATCH_SIZE:
+                        await self._redis.unlink(*batch)
+                        batch.clear()
+                if batch:
+                    await self._redis.unlink(*batch)
                 logger.warning("blacklist_cleared_redis")
             except Exception as e:
                 logger.error("redis_clear_failed", error=str(e))
 
         # Clear in-memory storage
-        async with self._lock:
-            self._blacklist.clear()
-            logger.warning("blacklist_cleared_memory")
+        self._blacklist.clear()
+        self._user_markers.clear()
+        self._expiry_heap.clear()
+        self._negative_cache.clear()
+        self._eviction_generation += 1
+        logger.warning("blacklist_cleared_memory")
 
 
 # Singleton instance
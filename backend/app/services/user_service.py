@@ -1,68 +1,134 @@
-from app.schemas.user import User, UserCreate, UserUpdate
-from app.core.hashing import get_password_hash, verify_password
+from app.schemas.user import User, UserCreate, UserUpdate, UserPlan, SubscriptionStatus, GoogleOAuthTokens
+from app.schemas.role import UserRole
+from app.core.hashing import DUMMY_PASSWORD_HASH, get_password_hash_async, verify_and_update_password_async, verify_password_async
 from app.core.logger import get_logger, LoggerMixin
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Tuple
 from .base_service import BaseService
+import copy
+import re
+import time
 import uuid
 from bson import ObjectId
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+from app.core.exceptions import DuplicateEmailException
 
 logger = get_logger(__name__)
 
+_OBJECT_ID_PATTERN = re.compile(r"^[0-9a-fA-F]{24}$")
+
+# Short-lived cache of raw user rows for the per-request get_user_by_id lookup.
+# Entries are evicted on document-level writes through Beanie (see User.evict_user_cache);
+# the TTL bounds staleness from writes on other workers.
+# Beanie hooks do not fire for query-level writes (User.find_one(...).update(...)) or raw
+# motor writes on the users collection: any such write must call invalidate_cached_user
+# for the affected user, as UserService.update, authenticate and OTPService.verify_otp do.
+USER_CACHE_TTL_SECONDS = 30
+USER_CACHE_MAX_SIZE = 10_000
+_user_cache: Dict[str, Tuple[float, Dict[str, Any]]] = {}  # user_id -> (monotonic expiry, raw row)
+
+_USER_ENUM_FIELDS = (
+    ("plan", UserPlan),
+    ("role", UserRole),
+    ("subscription_status", SubscriptionStatus),
+)
+
+
+def _user_from_db(raw: Optional[Dict[str, Any]]) -> Optional[User]:
+    """
+    Build a User from a trusted database row without re-running field validation.
+    Only the coercions the read path relies on are applied: string _id, enums
+    and the nested Google OAuth tokens model.
+    """
+    if raw is None:
+        return None
+    raw["_id"] = str(raw["_id"])
+    for field, enum_type in _USER_ENUM_FIELDS:
+        if field in raw:
+            raw[field] = enum_type(raw[field])
+    tokens = raw.get("google_oauth_tokens")
+    if tokens is not None:
+        raw["google_oauth_tokens"] = GoogleOAuthTokens.model_construct(**tokens)
+    return User.model_construct(**raw)
+
+
+def _user_id_query(user_id: str) -> Dict[str, Any]:
+    """
+    Match every stored id shape in one query: string _id (UUID), legacy "id" field,
+    and ObjectId _id when the value looks like one (no exception per UUID lookup).
+    """
+    clauses = [{"_id": user_id}, {"id": user_id}]
+    # The length check rejects UUIDs (36 chars) before the regex runs
+    if len(user_id) == 24 and _OBJECT_ID_PATTERN.match(user_id):
+        clauses.append({"_id": ObjectId(user_id)})
+    return {"$or": clauses}
+
+
+async def _find_user(query: Dict[str, Any]) -> Optional[User]:
+    return _user_from_db(await User.get_motor_collection().find_one(query))
+
+
+def invalidate_cached_user(user_id: str) -> None:
+    _user_cache.pop(user_id, None)
+
+
+def _cache_user(user_id: str, raw: Dict[str, Any]) -> None:
+    if len(_user_cache) >= USER_CACHE_MAX_SIZE:
+        # Dicts keep insertion order: drop the oldest entry
+        _user_cache.pop(next(iter(_user_cache)))
+    _user_cache[user_id] = (time.monotonic() + USER_CACHE_TTL_SECONDS, raw)
+
+
 async def get_user_by_id(user_id: str) -> Optional[User]:
     """
     Retrieves a user by their ID.
     Handles both MongoDB ObjectId format and UUID strings.
     """
-    logger.info("user_lookup_by_id", user_id=user_id)
+    cached = _user_cache.get(user_id)
+    if cached is not None and cached[0] > time.monotonic():
+        # Each hit gets its own instance built from a deep copy: nested values (OAuth tokens,
+        # lists) are not shared with the cache entry, so callers can mutate it freely
+        return _user_from_db(copy.deepcopy(cached[1]))
+
     try:
-        # Try converting to ObjectId first (for MongoDB _id queries)
-        try:
-            oid = ObjectId(user_id)
-            user = await User.find_one({"_id": oid})
-            if user:
-                logger.info("user_found", lookup_method="objectid", email=user.email)
-                return user
-        except Exception as oid_error:
-            logger.debug("objectid_parse_failed", error=str(oid_error))
-
-        # Fallback: Try as string _id
-        user = await User.find_one({"_id": user_id})
-        if user:
-            logger.info("user_found", lookup_method="string_id", email=user.email)
-            return user
-
-        # Fallback: Try by id field (UUID string)
-        logger.debug("user_lookup_fallback", lookup_method="id_field")
-        user = await User.find_one({"id": user_id})
-
-        if user:
-            logger.info("user_found", lookup_method="id_field", email=user.email)
-        else:
+        raw = await User.get_motor_collection().find_one(_user_id_query(user_id))
+        # Only cache lookups by the canonical _id, which is what write hooks evict by
+        if raw is not None and str(raw["_id"]) == user_id:
+            _cache_user(user_id, raw)
+        if raw is None:
             logger.warning("user_not_found", user_id=user_id)
-        return user
+            return None
+        return _user_from_db(copy.deepcopy(raw))
     except Exception as e:
         logger.error("user_lookup_error", user_id=user_id, error=str(e), exc_info=True)
         return None
 
 class UserService(BaseService[User, UserCreate, UserUpdate]):
+    # The plaintext password is never copied into the stored document
+    _CREATE_DUMP_EXCLUDE = frozenset({"password"})
+
     async def create(self, obj_in: UserCreate, **kwargs: Any) -> User:
         """
         Overrides the base create method to handle password hashing.
+        Raises DuplicateEmailException if the email is already registered.
         """
-        password_hash = get_password_hash(obj_in.password)
-        user_data = obj_in.model_dump(exclude={"password"})
+        password_hash = await get_password_hash_async(obj_in.password)
+        user_data = obj_in.model_dump(exclude=self._CREATE_DUMP_EXCLUDE)
         user_data["password_hash"] = password_hash
         user_data["id"] = str(uuid.uuid4())
         db_user = User(**user_data)
-        await db_user.insert()
+        # The unique email index rejects duplicates atomically, so no pre-check query is needed
+        try:
+            await db_user.insert()
+        except DuplicateKeyError:
+            raise DuplicateEmailException()
         return db_user
 
     async def get_user_by_email(self, email: str) -> Optional[User]:
         """
         Retrieves a user by their email address.
         """
-        logger.info("user_lookup_by_email", email=email)
-        return await User.find_one({"email": email})
+        return await _find_user({"email": email})
 
     async def get_user_by_id(self, user_id: str) -> Optional[User]:
         """
@@ -74,10 +140,28 @@ class UserService(BaseService[User, UserCreate, UserUpdate]):
         """
         Authenticates a user. Returns the user object if successful, otherwise None.
         """
-        user = await self.get_user_by_email(email)
-        if not user or not user.password_hash or not verify_password(password, user.password_hash):
+        # One read per login: the row that is verified is the row returned. Lockout
+        # state lives in account_lockout (in memory), so it needs no extra round-trip
+        raw = await User.get_motor_collection().find_one({"email": email})
+        password_hash = raw.get("password_hash") if raw else None
+        # Exactly one hash verify on every path, against a dummy hash when there is no
+        # account or password, so missing accounts are not revealed by timing
+        password_ok, upgraded_hash = await verify_and_update_password_async(
+            password, password_hash or DUMMY_PASSWORD_HASH
+        )
+        if not (password_hash and password_ok):
             return None
-        return user
+        if upgraded_hash:
+            # Legacy bcrypt hash: store the argon2id rehash (once per account)
+            user_id = str(raw["_id"])
+            await User.get_motor_collection().update_one(
+                {"_id": raw["_id"]},
+                {"$set": {"password_hash": upgraded_hash}}
+            )
+            raw["password_hash"] = upgraded_hash
+            invalidate_cached_user(user_id)
+            logger.info("password_hash_upgraded", user_id=user_id)
+        return _user_from_db(raw)
 
     # Allowlist of fields that users can update on their own profile
     # SECURITY: Do not add sensitive fields like 'role', 'plan', 'is_verified', 'password_hash', etc.
@@ -88,43 +172,56 @@ class UserService(BaseService[User, UserCreate, UserUpdate]):
         'profile_image',
         'preferences',
     })
+    # Allowed fields that exist on the User model and are therefore written
+    _WRITABLE_UPDATE_FIELDS = ALLOWED_UPDATE_FIELDS & frozenset(User.model_fields)
 
     async def update(self, user_id: str, user_data: dict) -> Optional[User]:
         """
         Updates a user's information.
         Only allows updating fields in ALLOWED_UPDATE_FIELDS to prevent mass assignment attacks.
         """
-        logger.info("user_update_started", user_id=user_id)
+        logger.debug("user_update_started", user_id=user_id)
         try:
-            user = await self.get_user_by_id(user_id)
-            if not user:
-                logger.warning("user_update_not_found", user_id=user_id)
-                return None
-
-            # Filter to only allowed fields to prevent mass assignment vulnerability
-            filtered_data = {
-                key: value for key, value in user_data.items()
-                if key in self.ALLOWED_UPDATE_FIELDS
-            }
+            # Filter to only allowed fields to prevent mass assignment vulnerability.
+            # One pass sorts each key into written, allowed-but-not-stored, or rejected
+            update_fields = {}
+            allowed_fields = []
+            rejected_fields = []
+            for key, value in user_data.items():
+                if key in self._WRITABLE_UPDATE_FIELDS:
+                    update_fields[key] = value
+                    allowed_fields.append(key)
+                elif key in self.ALLOWED_UPDATE_FIELDS:
+                    allowed_fields.append(key)
+                else:
+                    rejected_fields.append(key)
 
             # Log any rejected fields for security monitoring
-            rejected_fields = set(user_data.keys()) - set(filtered_data.keys())
             if rejected_fields:
                 logger.warning(
                     "user_update_rejected_fields",
                     user_id=user_id,
-                    rejected_fields=list(rejected_fields)
+                    rejected_fields=rejected_fields
                 )
 
-            # Update only filtered fields
-            for key, value in filtered_data.items():
-                if hasattr(user, key):
-                    setattr(user, key, value)
-                    logger.debug("user_field_updated", field=key)
+            # updated_at is stamped server-side, so it is consistent across workers' clocks
+            update_doc = {"$currentDate": {"updated_at": True}}
+            if update_fields:
+                update_doc["$set"] = update_fields
+
+            # Single round-trip: $set only the changed fields and return the updated document
+            result = await User.get_motor_collection().find_one_and_update(
+                _user_id_query(user_id),
+                update_doc,
+                return_document=ReturnDocument.AFTER
+            )
+            invalidate_cached_user(user_id)
+            if not result:
+                logger.warning("user_update_not_found", user_id=user_id)
+                return None
 
-            await user.save()
-            logger.info("user_update_success", user_id=user_id, fields_updated=list(filtered_data.keys()))
-            return user
+            logger.info("user_update_success", user_id=user_id, fields_updated=allowed_fields)
+            return _user_from_db(result)
         except Exception as e:
             logger.error("user_update_error", user_id=user_id, error=str(e), exc_info=True)
             raise
@@ -147,7 +244,7 @@ class UserService(BaseService[User, UserCreate, UserUpdate]):
         logger.info("password_change_started", user_id=str(user.id))
 
         # Verify current password
-        if not user.password_hash or not verify_password(current_password, user.password_hash):
+        if not user.password_hash or not await verify_password_async(current_password, user.password_hash):
             logger.warning("password_change_invalid_current", user_id=str(user.id))
             raise ValueError("Current password is incorrect")
 
@@ -155,9 +252,8 @@ class UserService(BaseService[User, UserCreate, UserUpdate]):
         if len(new_password) < 12:
             raise ValueError("New password must be at least 12 characters long")
 
-        # Hash and save new password
-        user.password_hash = get_password_hash(new_password)
-        await user.save()
+        # Hash and store the new password with a partial $set rather than replacing the document
+        await user.set({"password_hash": await get_password_hash_async(new_password)})
 
         # Revoke all existing tokens for this user (force re-login on all devices)
         # Lazy import to avoid circular dependency
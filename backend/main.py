@@ -1,49 +1,122 @@
+import asyncio
 import logging
 import time
 import uuid
 
+import orjson
 from beanie import init_beanie
-from fastapi import FastAPI, Request, Response
+from fastapi import FastAPI, Response
+from fastapi.responses import ORJSONResponse
 from fastapi_cache import FastAPICache
 from fastapi_cache.backends.inmemory import InMemoryBackend
-from fastapi_cache.backends.redis import RedisBackend
 from redis import asyncio as aioredis
 from slowapi import _rate_limit_exceeded_handler
 from slowapi.errors import RateLimitExceeded
 from starlette.middleware.cors import CORSMiddleware
-from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 from contextlib import asynccontextmanager
+from functools import lru_cache
+from typing import Optional
+from urllib.parse import urlparse
 from app.middleware.logging import LoggingMiddleware
 from app.middleware.auth import AuthMiddleware
 
 from app import api
+from app.core.cache import ResilientCacheBackend
 from app.core.config import settings
 from app.core.exceptions import APIException, api_exception_handler, generic_exception_handler
 from app.core.limiter import limiter
 from app.core.logging_config import setup_logging
 from app.core.monitoring import init_monitoring
 from app.db.init_db import init_dummy_data
+from app.db.models import DOCUMENT_MODELS
 from app.db.session import close_mongo_connection, connect_to_mongo, get_database
-from app.schemas.clinical_note import ClinicalNote
-from app.schemas.document import Document
-from app.schemas.feedback import Feedback
-from app.schemas.patient import Patient
-from app.schemas.user import User
-from app.schemas.telemetry import Telemetry
-from app.schemas.error_event import ErrorEvent
-from app.schemas.query_performance_event import QueryPerformanceEvent
-from app.schemas.sync_event import SyncEvent
-from app.schemas.beta_feedback import BetaFeedback
-from app.schemas.google_contacts import GoogleContactsSyncJob, DuplicateRecord
+from app.services.sync_service import flush_sync_events
+from app.services.token_blacklist_service import token_blacklist
+
+
+async def init_database():
+    """Connect to MongoDB and initialize Beanie ODM."""
+    await connect_to_mongo()
+    db = await get_database()
+    # No index dropping: indexes owned by scripts/create_indexes.py (idx_user_favorites,
+    # idx_name_text, ...) are not declared on the models and would be dropped on every start.
+    # Startup therefore only adds missing indexes; a changed definition ships under a new
+    # name, and the index it supersedes is dropped by a migration run before deploy
+    # (scripts/migrate_deleted_at.py, run by scripts/production_setup.sh)
+    await init_beanie(
+        database=db,
+        document_models=DOCUMENT_MODELS
+    )
+
+
+# Response cache Redis pool: bounded, and with short socket timeouts so a slow Redis
+# fails fast and the cache moves to memory instead of stalling requests
+CACHE_REDIS_MAX_CONNECTIONS = 50
+CACHE_REDIS_SOCKET_TIMEOUT = 0.15  # seconds
+CACHE_REDIS_CONNECT_TIMEOUT = 0.5  # seconds
+CACHE_REDIS_HEALTH_CHECK_INTERVAL = 30  # seconds
+# Upper bound on the startup ping, DNS resolution included
+CACHE_REDIS_STARTUP_TIMEOUT = 2.0  # seconds
+
+# Schemes redis-py accepts; anything else is a configuration error, reported once at startup
+REDIS_URL_SCHEMES = frozenset({"redis", "rediss", "unix"})
+REDIS_URL_VALID = bool(settings.REDIS_URL) and urlparse(settings.REDIS_URL).scheme in REDIS_URL_SCHEMES
+
+
+async def _setup_cache() -> Optional[ResilientCacheBackend]:
+    """
+    Initialize the response cache: Redis if REDIS_URL is set and reachable, otherwise in-memory.
+    Returns the Redis-backed cache backend, if any, so it can be closed on shutdown.
+    """
+    if settings.REDIS_URL and not REDIS_URL_VALID:
+        logging.warning("REDIS_URL is not a redis://, rediss:// or unix:// URL. Using InMemoryBackend for cache.")
+        FastAPICache.init(InMemoryBackend(), prefix="fastapi-cache")
+    elif settings.REDIS_URL:
+        pool = None
+        try:
+            pool = aioredis.ConnectionPool.from_url(
+                settings.REDIS_URL,
+                encoding="utf-8",
+                decode_responses=True,
+                max_connections=CACHE_REDIS_MAX_CONNECTIONS,
+                socket_timeout=CACHE_REDIS_SOCKET_TIMEOUT,
+                socket_connect_timeout=CACHE_REDIS_CONNECT_TIMEOUT,
+                health_check_interval=CACHE_REDIS_HEALTH_CHECK_INTERVAL
+            )
+            redis = aioredis.Redis(connection_pool=pool)
+            # Connections are lazy; ping so an unreachable server falls back now, not on the first cached request
+            await asyncio.wait_for(redis.ping(), timeout=CACHE_REDIS_STARTUP_TIMEOUT)
+            # Switches to in-memory if Redis fails later on, and back once it answers pings again
+            backend = ResilientCacheBackend(redis, retry_interval=settings.REDIS_RETRY_INTERVAL)
+            FastAPICache.init(backend, prefix="fastapi-cache")
+            backend.start()
+            logging.info("Redis cache initialized.")
+            return backend
+        except Exception as e:
+            logging.warning(f"Could not initialize Redis cache: {e}. Falling back to InMemoryBackend.")
+            if pool is not None:
+                await pool.disconnect()
+            FastAPICache.init(InMemoryBackend(), prefix="fastapi-cache")
+    else:
+        logging.warning("REDIS_URL not set. Using InMemoryBackend for cache.")
+        FastAPICache.init(InMemoryBackend(), prefix="fastapi-cache")
+    return None
 
 
 # --- Lifespan Management ---
+def _log_dummy_data_failure(task: asyncio.Task) -> None:
+    """Done-callback of the background seeding task: nothing awaits it, so log its failure here."""
+    if not task.cancelled() and task.exception() is not None:
+        logging.error("Dummy data initialization failed", exc_info=task.exception())
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """
     Actions to perform on application startup and shutdown.
     - Initialize Beanie ODM on startup.
-    - Initialize dummy data for development environments on startup.
+    - Initialize dummy data outside production, in the background, on startup.
     - Close database connections gracefully on shutdown.
     """
     setup_logging()
@@ -52,37 +125,31 @@ async def lifespan(app: FastAPI):
     # Initialize Sentry Monitoring
     init_monitoring()
 
-    # Initialize Redis cache if REDIS_URL is set, otherwise use in-memory backend
-    if settings.REDIS_URL:
-        try:
-            redis = aioredis.from_url(settings.REDIS_URL, encoding="utf-8", decode_responses=True)
-            FastAPICache.init(RedisBackend(redis), prefix="fastapi-cache")
-            logging.info("Redis cache initialized.")
-        except Exception as e:
-            logging.warning(f"Could not initialize Redis cache: {e}. Falling back to InMemoryBackend.")
-            FastAPICache.init(InMemoryBackend(), prefix="fastapi-cache")
-    else:
-        logging.warning("REDIS_URL not set. Using InMemoryBackend for cache.")
-        FastAPICache.init(InMemoryBackend(), prefix="fastapi-cache")
-
-    # Initialize token blacklist service (Redis-backed or in-memory fallback)
-    from app.services.token_blacklist_service import token_blacklist
-    await token_blacklist.initialize()
+    # Response cache, token blacklist (both Redis-backed or in-memory fallback) and
+    # MongoDB/Beanie are independent, so their connection handshakes run concurrently
+    app.state.cache_backend, _, _ = await asyncio.gather(
+        _setup_cache(), token_blacklist.initialize(), init_database()
+    )
     logging.info("Token blacklist service initialized.")
 
-    await connect_to_mongo()
-    db = await get_database()
-    await init_beanie(
-        database=db,
-        document_models=[User, Patient, ClinicalNote, Document, Feedback, Telemetry, ErrorEvent, QueryPerformanceEvent, SyncEvent, BetaFeedback, GoogleContactsSyncJob, DuplicateRecord],
-        allow_index_dropping=True
-    )
-    await init_dummy_data()
-    logging.info("Dummy data initialization complete.")
+    # Demo accounts (with a well-known password) must never be seeded in production.
+    # Elsewhere seeding runs in the background so startup does not wait on it
+    app.state.dummy_data_task = None
+    if settings.ENV != "production":
+        app.state.dummy_data_task = asyncio.create_task(init_dummy_data())
+        app.state.dummy_data_task.add_done_callback(_log_dummy_data_failure)
 
     yield
 
     logging.info("Application shutting down...")
+    # Seeding writes to MongoDB: stop it (if still running) before the client is closed
+    if app.state.dummy_data_task is not None:
+        app.state.dummy_data_task.cancel()
+        await asyncio.gather(app.state.dummy_data_task, return_exceptions=True)
+    await token_blacklist.close()
+    if app.state.cache_backend is not None:
+        await app.state.cache_backend.close()
+    await flush_sync_events()
     await close_mongo_connection()
     logging.info("Database connections closed.")
 
@@ -91,6 +158,8 @@ app = FastAPI(
     title="Medical Contacts API",
     version="3.0",
     description="Refactored API for managing medical contacts with advanced features.",
+    # orjson serializes datetimes, UUIDs and large payloads far faster than stdlib json
+    default_response_class=ORJSONResponse,
     lifespan=lifespan
 )
 app.state.limiter = limiter
@@ -98,199 +167,234 @@ app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
 app.add_exception_handler(APIException, api_exception_handler)
 app.add_exception_handler(Exception, generic_exception_handler)
 
-# --- Security Headers Middleware ---
-class SecurityHeadersMiddleware(BaseHTTPMiddleware):
-    """Add security headers to all responses."""
-    async def dispatch(self, request, call_next):
-        response = await call_next(request)
-        response.headers["X-Content-Type-Options"] = "nosniff"
-        response.headers["X-Frame-Options"] = "DENY"
-        response.headers["X-XSS-Protection"] = "1; mode=block"
-        response.headers["Referrer-Policy"] = "strict-origin-when-cross-origin"
-        response.headers["Permissions-Policy"] = "geolocation=(), microphone=(), camera=()"
-        # HSTS header for production (enforce HTTPS)
-        if settings.ENV == "production":
-            response.headers["Strict-Transport-Security"] = "max-age=31536000; includeSubDomains"
-        return response
+async def send_json_error(send: Send, status_code: int, body: bytes):
+    """Send a complete JSON error response from a pure ASGI middleware."""
+    await send({
+        "type": "http.response.start",
+        "status": status_code,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode("latin-1")),
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
 
 
-# --- CSRF Protection Middleware ---
-class CSRFProtectionMiddleware(BaseHTTPMiddleware):
-    """
-    CSRF protection via Origin/Referer header validation.
+# --- Allowed Origins ---
+# Parsed once at import: settings are fixed for the lifetime of the process.
+# Entries are stripped ("https://a.com, https://b.com") since browsers send the bare origin
+CORS_ALLOWED_ORIGINS = [origin.strip() for origin in settings.ALLOWED_ORIGINS.split(',') if origin.strip()]
 
-    For state-changing requests (POST, PUT, DELETE, PATCH), validates that
-    the Origin or Referer header matches allowed origins.
 
-    This is defense-in-depth for token-based auth, as Bearer tokens
-    are inherently CSRF-safe (they can't be sent automatically by browsers).
-    """
+@lru_cache(maxsize=1024)
+def _referer_origin(referer: str) -> str:
+    """scheme://netloc of a Referer; cached since a few client pages send most referers."""
+    parsed_referer = urlparse(referer)
+    return f"{parsed_referer.scheme}://{parsed_referer.netloc}"
 
-    SAFE_METHODS = {"GET", "HEAD", "OPTIONS"}
-
-    async def dispatch(self, request: Request, call_next):
-        # Skip validation for safe methods
-        if request.method in self.SAFE_METHODS:
-            return await call_next(request)
-
-        # Skip for health check endpoints
-        if request.url.path in ["/health", "/api", "/api/health"]:
-            return await call_next(request)
-
-        # Skip for authentication endpoints (public endpoints that mobile apps need without auth)
-        # These are rate-limited separately and don't require CSRF protection since:
-        # 1. They're public endpoints users access before having a token
-        # 2. Mobile apps don't use browser cookies, so no CSRF attack vector
-        auth_endpoints = [
-            "/api/auth/register",
-            "/api/auth/login",
-            "/api/auth/verify-otp",
-            "/api/auth/resend-otp",
-            "/api/auth/forgot-password",
-            "/api/auth/reset-password",
-            "/api/auth/refresh",
-        ]
-        if request.url.path in auth_endpoints:
-            return await call_next(request)
-
-        # Get allowed origins from settings
-        allowed_origins = (
-            settings.ALLOWED_ORIGINS.split(',')
-            if ',' in settings.ALLOWED_ORIGINS
-            else [settings.ALLOWED_ORIGINS]
-        )
-        # Add common localhost variations for development
-        if settings.ENV != "production":
-            allowed_origins.extend([
-                "http://localhost:3000",
-                "http://localhost:8000",
-                "http://127.0.0.1:3000",
-                "http://127.0.0.1:8000",
-            ])
 
-        # Check Origin header first (preferred)
-        origin = request.headers.get("origin")
-        if origin:
-            origin_allowed = any(
-                origin == allowed or allowed == "*"
-                for allowed in allowed_origins
-            )
-            if not origin_allowed:
-                logging.warning(f"[CSRF] Blocked request from origin: {origin}")
-                return Response(
-                    content='{"detail": "CSRF validation failed: Origin not allowed"}',
-                    status_code=403,
-                    media_type="application/json"
-                )
-            return await call_next(request)
-
-        # Fall back to Referer header for same-origin requests
-        referer = request.headers.get("referer")
-        if referer:
-            from urllib.parse import urlparse
-            referer_origin = f"{urlparse(referer).scheme}://{urlparse(referer).netloc}"
-            referer_allowed = any(
-                referer_origin == allowed or allowed == "*"
-                for allowed in allowed_origins
-            )
-            if not referer_allowed:
-                logging.warning(f"[CSRF] Blocked request from referer: {referer}")
-                return Response(
-                    content='{"detail": "CSRF validation failed: Referer not allowed"}',
-                    status_code=403,
-                    media_type="application/json"
-                )
-            return await call_next(request)
-
-        # For mobile apps and API clients without Origin/Referer,
-        # require Authorization header (which can't be set by CSRF attacks)
-        auth_header = request.headers.get("authorization")
-        if auth_header:
-            return await call_next(request)
-
-        # No Origin, Referer, or Authorization - block in production
-        if settings.ENV == "production":
-            logging.warning(f"[CSRF] Blocked request without origin validation: {request.url.path}")
-            return Response(
-                content='{"detail": "CSRF validation failed: No origin information"}',
-                status_code=403,
-                media_type="application/json"
-            )
-
-        # Allow in development for testing
-        return await call_next(request)
-
-
-# --- Request Size Limit Middleware ---
-class RequestSizeLimitMiddleware(BaseHTTPMiddleware):
+# --- Security Middleware ---
+class SecurityMiddleware:
     """
-    Limits request body size to prevent DoS attacks.
-
-    Default limit: 10MB for most requests
-    Higher limit: 50MB for specific upload endpoints (photos, documents)
+    Security headers, CSRF protection and request size limits in one pure ASGI middleware.
+
+    1. Security headers are added to every response, rejections included.
+    2. CSRF protection via Origin/Referer header validation: for state-changing
+       requests (POST, PUT, DELETE, PATCH), validates that the Origin or Referer
+       header matches allowed origins. This is defense-in-depth for token-based
+       auth, as Bearer tokens are inherently CSRF-safe (they can't be sent
+       automatically by browsers).
+    3. Request body size limits to prevent DoS attacks, from Content-Length:
+       10MB by default, 50MB for specific upload endpoints (photos, documents).
+
+    Method, path and headers are read straight from the scope in a single pass,
+    and rejections are sent as pre-encoded responses.
     """
 
+    # --- Security headers ---
+    # Pre-encoded once: each response appends them to its raw header list in one step.
+    # No route sets these headers itself, so appending cannot duplicate one
+    HEADERS = [
+        (b"x-content-type-options", b"nosniff"),
+        (b"x-frame-options", b"DENY"),
+        (b"x-xss-protection", b"1; mode=block"),
+        (b"referrer-policy", b"strict-origin-when-cross-origin"),
+        (b"permissions-policy", b"geolocation=(), microphone=(), camera=()"),
+    ]
+    # HSTS header for production (enforce HTTPS)
+    if settings.ENV == "production":
+        HEADERS.append((b"strict-transport-security", b"max-age=31536000; includeSubDomains"))
+
+    # --- CSRF protection ---
+    SAFE_METHODS = frozenset({"GET", "HEAD", "OPTIONS"})
+
+    HEALTH_ENDPOINTS = frozenset({"/health", "/api", "/api/health"})
+
+    # Authentication endpoints (public endpoints that mobile apps need without auth)
+    # These are rate-limited separately and don't require CSRF protection since:
+    # 1. They're public endpoints users access before having a token
+    # 2. Mobile apps don't use browser cookies, so no CSRF attack vector
+    AUTH_ENDPOINTS = frozenset({
+        "/api/auth/register",
+        "/api/auth/login",
+        "/api/auth/verify-otp",
+        "/api/auth/resend-otp",
+        "/api/auth/forgot-password",
+        "/api/auth/reset-password",
+        "/api/auth/refresh",
+    })
+    CSRF_SKIP_PATHS = HEALTH_ENDPOINTS | AUTH_ENDPOINTS
+
+    # Allowed origins from settings, plus common localhost variations for development
+    ALLOWED_ORIGINS = frozenset(
+        CORS_ALLOWED_ORIGINS if settings.ENV == "production" else CORS_ALLOWED_ORIGINS + [
+            "http://localhost:3000",
+            "http://localhost:8000",
+            "http://127.0.0.1:3000",
+            "http://127.0.0.1:8000",
+        ]
+    )
+    ALLOW_ANY_ORIGIN = "*" in ALLOWED_ORIGINS
+
+    # Rejection bodies, encoded once with the same serializer as every other response
+    ORIGIN_NOT_ALLOWED = orjson.dumps({"detail": "CSRF validation failed: Origin not allowed"})
+    REFERER_NOT_ALLOWED = orjson.dumps({"detail": "CSRF validation failed: Referer not allowed"})
+    NO_ORIGIN_INFORMATION = orjson.dumps({"detail": "CSRF validation failed: No origin information"})
+
+    # --- Request size limits ---
     # Default max size: 10MB
     DEFAULT_MAX_SIZE = 10 * 1024 * 1024
 
     # Higher limit for upload endpoints: 50MB
     UPLOAD_MAX_SIZE = 50 * 1024 * 1024
 
-    # Endpoints that allow larger uploads
-    UPLOAD_ENDPOINTS = [
+    # Endpoints that allow larger uploads (a tuple so str.startswith tests them all in one call)
+    UPLOAD_ENDPOINTS = (
         "/api/patients",  # Patient photos
         "/api/documents",  # Document uploads
         "/api/users/me",  # Profile photos
-    ]
+    )
+
+    # Non-safe methods without a body worth checking
+    SIZE_SKIP_METHODS = frozenset({"DELETE"})
+
+    # 413 bodies per limit, encoded once
+    TOO_LARGE_BODIES = {
+        max_size: orjson.dumps({"detail": f"Request body too large. Maximum size is {max_size // (1024 * 1024)}MB"})
+        for max_size in (DEFAULT_MAX_SIZE, UPLOAD_MAX_SIZE)
+    }
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
 
-    async def dispatch(self, request: Request, call_next):
-        # Skip size check for safe methods
-        if request.method in {"GET", "HEAD", "OPTIONS", "DELETE"}:
-            return await call_next(request)
+    def _origin_allowed(self, origin: str) -> bool:
+        return self.ALLOW_ANY_ORIGIN or origin in self.ALLOWED_ORIGINS
+
+    def _check_csrf(self, path: str, origin: Optional[bytes], referer: Optional[bytes],
+                    authorization: Optional[bytes]) -> Optional[bytes]:
+        """Returns the 403 body if the request fails CSRF validation, else None."""
+        # Skip for health check and authentication endpoints
+        if path in self.CSRF_SKIP_PATHS:
+            return None
+
+        # Requests carrying an Authorization header (mobile apps and API clients, most
+        # traffic) are CSRF-safe: browsers never attach it on their own, and a cross-origin
+        # script setting it triggers a CORS preflight. Accept them before any origin work
+        if authorization:
+            return None
+
+        # Check Origin header first (preferred)
+        if origin:
+            origin = origin.decode("latin-1")
+            if not self._origin_allowed(origin):
+                logging.warning(f"[CSRF] Blocked request from origin: {origin}")
+                return self.ORIGIN_NOT_ALLOWED
+            return None
+
+        # Fall back to Referer header for same-origin requests
+        if referer:
+            referer = referer.decode("latin-1")
+            if not self._origin_allowed(_referer_origin(referer)):
+                logging.warning(f"[CSRF] Blocked request from referer: {referer}")
+                return self.REFERER_NOT_ALLOWED
+            return None
+
+        # No Origin, Referer or Authorization: block in production, allow in development for testing
+        if settings.ENV == "production":
+            logging.warning(f"[CSRF] Blocked request without origin validation: {path}")
+            return self.NO_ORIGIN_INFORMATION
+        return None
+
+    def _check_size(self, path: str, content_length: Optional[bytes]) -> Optional[bytes]:
+        """Returns the 413 body if Content-Length exceeds the path's limit, else None."""
+        if not content_length:
+            return None
+        try:
+            size = int(content_length)
+        except ValueError:
+            return None  # Invalid content-length, let the request proceed
 
         # Determine max size based on endpoint
-        max_size = self.DEFAULT_MAX_SIZE
-        for endpoint in self.UPLOAD_ENDPOINTS:
-            if request.url.path.startswith(endpoint):
-                max_size = self.UPLOAD_MAX_SIZE
-                break
-
-        # Check Content-Length header
-        content_length = request.headers.get("content-length")
-        if content_length:
-            try:
-                size = int(content_length)
-                if size > max_size:
-                    max_mb = max_size / (1024 * 1024)
-                    logging.warning(
-                        f"[REQUEST_SIZE] Rejected request to {request.url.path}: "
-                        f"size {size} exceeds limit {max_size}"
-                    )
-                    return Response(
-                        content=f'{{"detail": "Request body too large. Maximum size is {max_mb:.0f}MB"}}',
-                        status_code=413,
-                        media_type="application/json"
-                    )
-            except ValueError:
-                pass  # Invalid content-length, let the request proceed
-
-        return await call_next(request)
+        max_size = self.UPLOAD_MAX_SIZE if path.startswith(self.UPLOAD_ENDPOINTS) else self.DEFAULT_MAX_SIZE
+        if size > max_size:
+            logging.warning(
+                f"[REQUEST_SIZE] Rejected request to {path}: "
+                f"size {size} exceeds limit {max_size}"
+            )
+            return self.TOO_LARGE_BODIES[max_size]
+        return None
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_headers(message: Message):
+            if message["type"] == "http.response.start":
+                message["headers"] = [*message.get("headers", ()), *self.HEADERS]
+            await send(message)
+
+        method = scope["method"]
+        if method not in self.SAFE_METHODS:
+            # One pass over the raw headers; the first occurrence wins, as with Request.headers.get
+            origin = referer = authorization = content_length = None
+            for name, value in scope["headers"]:
+                if name == b"origin":
+                    if origin is None:
+                        origin = value
+                elif name == b"referer":
+                    if referer is None:
+                        referer = value
+                elif name == b"authorization":
+                    if authorization is None:
+                        authorization = value
+                elif name == b"content-length":
+                    if content_length is None:
+                        content_length = value
+
+            path = scope["path"]
+            status_code = 403
+            body = self._check_csrf(path, origin, referer, authorization)
+            if body is None and method not in self.SIZE_SKIP_METHODS:
+                status_code = 413
+                body = self._check_size(path, content_length)
+            if body is not None:
+                await send_json_error(send_with_headers, status_code, body)
+                return
+
+        await self.app(scope, receive, send_with_headers)
 
 
 # --- Middleware ---
 # Middleware applied bottom-to-top (last added = first executed)
 # Execution order for incoming requests:
 # 1. CORS (outermost - handles preflight)
-# 2. Security Headers (add headers to all responses)
-# 3. CSRF Protection (validate origin/referer)
-# 4. Request Size Limit (reject oversized requests early)
-# 5. Auth (decode JWT once, set context)
-# 6. Logging (innermost - logs with auth context)
+# 2. Security (add headers to all responses, validate origin/referer, reject oversized requests early)
+# 3. Auth (decode JWT once, set context)
+# 4. Logging (innermost - logs with auth context)
 app.add_middleware(LoggingMiddleware)
 app.add_middleware(AuthMiddleware)
-app.add_middleware(RequestSizeLimitMiddleware)
-app.add_middleware(CSRFProtectionMiddleware)
-app.add_middleware(SecurityHeadersMiddleware)
+app.add_middleware(SecurityMiddleware)
 
 # CORS Configuration - restrict methods and headers to only what's needed
 ALLOWED_METHODS = ["GET", "POST", "PUT", "DELETE", "PATCH", "OPTIONS"]
@@ -305,7 +409,7 @@ ALLOWED_HEADERS = [
 
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=settings.ALLOWED_ORIGINS.split(',') if ',' in settings.ALLOWED_ORIGINS else [settings.ALLOWED_ORIGINS],
+    allow_origins=CORS_ALLOWED_ORIGINS,
     allow_credentials=True,
     allow_methods=ALLOWED_METHODS,
     allow_headers=ALLOWED_HEADERS,
@@ -331,13 +435,17 @@ app.include_router(api.health.router, prefix="/api", tags=["Health"])
 app.include_router(api.metrics.router, prefix="/api", tags=["Metrics"])
 app.include_router(api.version.router, prefix="/api", tags=["Version"])
 
+# Probe responses never change: encoded once, sent as-is on every hit
+HEALTH_BODY = orjson.dumps({"status": "healthy"})
+ROOT_BODY = orjson.dumps({"message": "Welcome to the Medical Contacts API v3.0"})
+
 # --- Health Check Endpoint ---
 @app.get("/health")
 async def health_check():
     """
     Health check endpoint for monitoring services.
     """
-    return {"status": "healthy"}
+    return Response(HEALTH_BODY, media_type="application/json")
 
 # --- Root Endpoint ---
 @app.get("/api")
@@ -345,4 +453,4 @@ async def root():
     """
     Root endpoint for health checks.
     """
-    return {"message": "Welcome to the Medical Contacts API v3.0"}
+    return Response(ROOT_BODY, media_type="application/json")
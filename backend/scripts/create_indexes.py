@@ -6,10 +6,12 @@ Creates indexes on MongoDB collections for improved query performance.
 
 import asyncio
 from motor.motor_asyncio import AsyncIOMotorClient
-from pymongo import ASCENDING, DESCENDING
+from pymongo import ASCENDING, DESCENDING, IndexModel
 import os
 import logging
 
+from migrate_deleted_at import drop_legacy_indexes
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
@@ -17,162 +19,187 @@ logger = logging.getLogger(__name__)
 MONGODB_URL = os.getenv("MONGODB_URL", "mongodb://localhost:27017")
 DATABASE_NAME = os.getenv("DATABASE_NAME", "heallog")
 
-async def create_indexes():
-    """Create database indexes for performance optimization"""
-    
-    try:
-        # Connect to MongoDB
-        client = AsyncIOMotorClient(MONGODB_URL)
-        db = client[DATABASE_NAME]
-        
-        logger.info(f"Connected to MongoDB: {DATABASE_NAME}")
-        
-        # ================================================================
-        # PATIENTS COLLECTION INDEXES
-        # ================================================================
-        logger.info("Creating indexes on 'patients' collection...")
+async def _create_patient_indexes(db):
+    """Create indexes on the patients collection"""
+    logger.info("Creating indexes on 'patients' collection...")
 
-        patients = db.patients
+    patients = db.patients
 
+    # Each collection's indexes are sent in one createIndexes command (one round-trip)
+    patient_indexes = [
         # Index on user_id (most critical - used in all patient queries)
-        await patients.create_index([("user_id", ASCENDING)], name="idx_user_id")
-        logger.info("✅ Created index: patients.user_id")
-
+        (IndexModel([("user_id", ASCENDING)], name="idx_user_id"),
+         "patients.user_id"),
         # Compound index on user_id + is_favorite (for favorites queries)
-        await patients.create_index(
+        (IndexModel(
             [("user_id", ASCENDING), ("is_favorite", DESCENDING)],
             name="idx_user_favorites"
-        )
-        logger.info("✅ Created index: patients.user_id + is_favorite")
-
+        ), "patients.user_id + is_favorite"),
         # Compound index on user_id + group (for group filtering)
-        await patients.create_index(
+        (IndexModel(
             [("user_id", ASCENDING), ("group", ASCENDING)],
             name="idx_user_group"
-        )
-        logger.info("✅ Created index: patients.user_id + group")
-
+        ), "patients.user_id + group"),
         # Index on patient_id for lookup
-        await patients.create_index([("patient_id", ASCENDING)], name="idx_patient_id")
-        logger.info("✅ Created index: patients.patient_id")
-
+        (IndexModel([("patient_id", ASCENDING)], name="idx_patient_id"),
+         "patients.patient_id"),
         # UNIQUE compound index on user_id + name (prevents duplicate patient names per user)
         # This enforces atomicity for patient creation race condition prevention
-        await patients.create_index(
+        (IndexModel(
             [("user_id", ASCENDING), ("name", ASCENDING)],
             unique=True,
             name="idx_user_name_unique"
-        )
-        logger.info("✅ Created UNIQUE index: patients.user_id + name")
-
+        ), "patients.user_id + name (unique)"),
         # Index on created_at for sorting
-        await patients.create_index([("created_at", DESCENDING)], name="idx_created_at")
-        logger.info("✅ Created index: patients.created_at")
-
+        (IndexModel([("created_at", DESCENDING)], name="idx_created_at"),
+         "patients.created_at"),
         # Compound index for sync queries (user_id + updated_at)
-        await patients.create_index(
+        (IndexModel(
             [("user_id", ASCENDING), ("updated_at", DESCENDING)],
             name="idx_sync_patients"
-        )
-        logger.info("✅ Created index: patients.user_id + updated_at (for sync)")
-
+        ), "patients.user_id + updated_at (for sync)"),
         # Index for soft delete queries (user_id + deleted_at)
         # Critical for sync operations that need to find deleted records
-        await patients.create_index(
+        (IndexModel(
             [("user_id", ASCENDING), ("deleted_at", ASCENDING)],
-            name="idx_user_deleted_at",
-            sparse=True  # Only index documents where deleted_at exists
-        )
-        logger.info("✅ Created index: patients.user_id + deleted_at (for soft delete)")
-
+            name="idx_user_deleted_at_partial",
+            # Only index soft-deleted documents (deleted_at holds a date)
+            partialFilterExpression={"deleted_at": {"$type": "date"}}
+        ), "patients.user_id + deleted_at (for soft delete)"),
         # Compound index for sync with soft delete filter
         # Optimizes: find records updated after X that are not deleted
-        await patients.create_index(
+        (IndexModel(
             [("user_id", ASCENDING), ("created_at", ASCENDING), ("deleted_at", ASCENDING)],
             name="idx_sync_created_deleted"
-        )
-        logger.info("✅ Created index: patients.user_id + created_at + deleted_at (for sync)")
-
+        ), "patients.user_id + created_at + deleted_at (for sync)"),
         # Text search index on name field for faster patient search
-        await patients.create_index(
+        (IndexModel(
             [("name", "text")],
             name="idx_name_text",
             default_language="english"
-        )
-        logger.info("✅ Created text index: patients.name (for search)")
-        
-        # ================================================================
-        # CLINICAL NOTES COLLECTION INDEXES
-        # ================================================================
-        logger.info("\nCreating indexes on 'clinical_notes' collection...")
+        ), "patients.name (text, for search)"),
+    ]
+    await patients.create_indexes([index for index, _ in patient_indexes])
+    for _, description in patient_indexes:
+        logger.info(f"✅ Created index: {description}")
 
-        notes = db.clinical_notes
 
-        # Index on patient_id (most critical for fetching patient notes)
-        await notes.create_index([("patient_id", ASCENDING)], name="idx_patient_id")
-        logger.info("✅ Created index: clinical_notes.patient_id")
+async def _create_note_indexes(db):
+    """Create indexes on the clinical_notes collection"""
+    logger.info("\nCreating indexes on 'clinical_notes' collection...")
 
-        # Index on user_id
-        await notes.create_index([("user_id", ASCENDING)], name="idx_user_id")
-        logger.info("✅ Created index: clinical_notes.user_id")
+    notes = db.clinical_notes
 
+    note_indexes = [
+        # Index on patient_id (most critical for fetching patient notes)
+        (IndexModel([("patient_id", ASCENDING)], name="idx_patient_id"),
+         "clinical_notes.patient_id"),
+        # Index on user_id
+        (IndexModel([("user_id", ASCENDING)], name="idx_user_id"),
+         "clinical_notes.user_id"),
         # Compound index on patient_id + created_at (for sorted note retrieval)
-        await notes.create_index(
+        (IndexModel(
             [("patient_id", ASCENDING), ("created_at", DESCENDING)],
             name="idx_patient_notes_sorted"
-        )
-        logger.info("✅ Created index: clinical_notes.patient_id + created_at")
-
+        ), "clinical_notes.patient_id + created_at"),
         # Compound index for sync queries (user_id + updated_at)
-        await notes.create_index(
+        (IndexModel(
             [("user_id", ASCENDING), ("updated_at", DESCENDING)],
             name="idx_sync_notes"
-        )
-        logger.info("✅ Created index: clinical_notes.user_id + updated_at (for sync)")
-
+        ), "clinical_notes.user_id + updated_at (for sync)"),
         # Index for soft delete queries (user_id + deleted_at)
         # Critical for sync operations that need to find deleted notes
-        await notes.create_index(
+        (IndexModel(
             [("user_id", ASCENDING), ("deleted_at", ASCENDING)],
-            name="idx_user_deleted_at",
-            sparse=True  # Only index documents where deleted_at exists
-        )
-        logger.info("✅ Created index: clinical_notes.user_id + deleted_at (for soft delete)")
-
+            name="idx_user_deleted_at_partial",
+            # Only index soft-deleted documents (deleted_at holds a date)
+            partialFilterExpression={"deleted_at": {"$type": "date"}}
+        ), "clinical_notes.user_id + deleted_at (for soft delete)"),
         # Compound index for sync with soft delete filter
         # Optimizes: find notes updated after X that are not deleted
-        await notes.create_index(
+        (IndexModel(
             [("user_id", ASCENDING), ("created_at", ASCENDING), ("deleted_at", ASCENDING)],
             name="idx_sync_created_deleted"
-        )
-        logger.info("✅ Created index: clinical_notes.user_id + created_at + deleted_at (for sync)")
-
+        ), "clinical_notes.user_id + created_at + deleted_at (for sync)"),
         # Compound index for patient notes with soft delete filter
         # Optimizes: get all non-deleted notes for a patient
-        await notes.create_index(
+        (IndexModel(
             [("patient_id", ASCENDING), ("deleted_at", ASCENDING), ("created_at", DESCENDING)],
             name="idx_patient_notes_active"
+        ), "clinical_notes.patient_id + deleted_at + created_at (for active notes)"),
+    ]
+    await notes.create_indexes([index for index, _ in note_indexes])
+    for _, description in note_indexes:
+        logger.info(f"✅ Created index: {description}")
+
+
+async def _create_user_indexes(db):
+    """Verify and create indexes on the users collection"""
+    logger.info("\nVerifying indexes on 'users' collection...")
+
+    users = db.users
+
+    # Verify an email index exists (Beanie creates email_1; earlier runs of this script idx_email).
+    # Matched on key, not name: re-creating the same key under another name is rejected by MongoDB
+    existing_indexes = await users.index_information()
+    has_email_index = any(list(idx["key"]) == [("email", ASCENDING)] for idx in existing_indexes.values())
+
+    # No partial {is_verified: true} email index: authenticate must also find unverified
+    # users (login re-sends their OTP), and the unique index below is needed for
+    # signup anyway, so a second email index would only add to the working set
+    user_indexes = [
+        # Legacy id field lookup (fallback in get_user_by_id for rows that predate _id UUIDs)
+        (IndexModel(
+            [("id", ASCENDING)],
+            name="idx_user_legacy_id",
+            sparse=True
+        ), "users.id (sparse, legacy rows only)"),
+        # Password reset token lookup (verify_reset_token finds the user by token hash)
+        (IndexModel(
+            [("password_reset_token", ASCENDING)],
+            name="idx_user_password_reset_token"
+        ), "users.password_reset_token"),
+    ]
+    if has_email_index:
+        logger.info("✅ Email index already exists: users.email")
+    else:
+        # Create email unique index if it doesn't exist
+        user_indexes.append((
+            IndexModel([("email", ASCENDING)], unique=True, name="idx_email"),
+            "users.email (unique)"
+        ))
+
+    await users.create_indexes([index for index, _ in user_indexes])
+    for _, description in user_indexes:
+        logger.info(f"✅ Created index: {description}")
+
+
+async def create_indexes():
+    """Create database indexes for performance optimization"""
+    
+    try:
+        # Connect to MongoDB
+        # One-shot script: a small pool is enough for the three concurrent collection builds
+        client = AsyncIOMotorClient(
+            MONGODB_URL,
+            maxPoolSize=4,
+            serverSelectionTimeoutMS=5000,
+            appname="create_indexes"
         )
-        logger.info("✅ Created index: clinical_notes.patient_id + deleted_at + created_at (for active notes)")
-        
-        # ================================================================
-        # USERS COLLECTION INDEXES
-        # ================================================================
-        logger.info("\nVerifying indexes on 'users' collection...")
-        
-        users = db.users
-        
-        # Verify email index exists (should be created by Beanie)
-        existing_indexes = await users.list_indexes().to_list(length=100)
-        has_email_index = any(idx.get('name') == 'email_1' for idx in existing_indexes)
-        
-        if has_email_index:
-            logger.info("✅ Email index already exists: users.email")
-        else:
-            # Create email unique index if it doesn't exist
-            await users.create_index([("email", ASCENDING)], unique=True, name="idx_email")
-            logger.info("✅ Created index: users.email (unique)")
+        db = client[DATABASE_NAME]
         
+        logger.info(f"Connected to MongoDB: {DATABASE_NAME}")
+
+        # Superseded indexes go first: a redefinition can conflict with what it replaces
+        await drop_legacy_indexes(db)
+
+        # Collections are independent: their createIndexes commands run concurrently
+        await asyncio.gather(
+            _create_patient_indexes(db),
+            _create_note_indexes(db),
+            _create_user_indexes(db)
+        )
+
         # ================================================================
         # SUMMARY
         # ================================================================
@@ -181,9 +208,12 @@ async def create_indexes():
         logger.info("="*60)
         
         # List all indexes for each collection
-        for collection_name in ["patients", "clinical_notes", "users"]:
-            collection = db[collection_name]
-            indexes = await collection.list_indexes().to_list(length=100)
+        collection_names = ["patients", "clinical_notes", "users"]
+        all_indexes = await asyncio.gather(*(
+            db[collection_name].list_indexes().to_list(length=100)
+            for collection_name in collection_names
+        ))
+        for collection_name, indexes in zip(collection_names, all_indexes):
             logger.info(f"\n{collection_name.upper()} Collection Indexes ({len(indexes)}):")
             for idx in indexes:
                 logger.info(f"  - {idx['name']}: {idx.get('key', 'N/A')}")
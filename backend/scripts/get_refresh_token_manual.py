@@ -13,6 +13,8 @@ import urllib.parse
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 # Path to your downloaded credentials JSON
 CREDENTIALS_FILE = os.path.join(
@@ -24,6 +26,16 @@ CREDENTIALS_FILE = os.path.join(
 # Scopes needed
 SCOPES = ['https://www.googleapis.com/auth/gmail.send']
 
+# Seconds to wait on Google's token endpoint before giving up
+TOKEN_REQUEST_TIMEOUT = 10
+
+# Retries connection failures with backoff. The authorization code is single-use, so a
+# POST that reached Google is never replayed (urllib3 does not retry POST on status codes)
+_session = requests.Session()
+_session.mount("https://", HTTPAdapter(
+    max_retries=Retry(total=3, backoff_factor=0.5, status_forcelist=[500, 502, 503, 504])
+))
+
 def get_refresh_token_manual():
     """Get refresh token using manual code exchange"""
     
@@ -87,7 +99,7 @@ def get_refresh_token_manual():
     print("\n⏳ Exchanging code for tokens...")
     
     try:
-        response = requests.post(token_url, data=token_data)
+        response = _session.post(token_url, data=token_data, timeout=TOKEN_REQUEST_TIMEOUT)
         
         if response.status_code == 200:
             tokens = response.json()
@@ -1,8 +1,11 @@
 import os
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import pymongo
 import time
 import json
+from concurrent.futures import ThreadPoolExecutor
 from faker import Faker
 import logging
 
@@ -13,9 +16,34 @@ logger = logging.getLogger(__name__)
 # Configuration
 API_URL = "http://localhost:8000/api"
 
+# Keep-alive pool size for the shared session (enough for concurrent requests to reuse sockets)
+HTTP_POOL_MAXSIZE = 16
+
 # Initialize Faker
 fake = Faker()
 
+# Patients created by the run: 2 before the first sync and 2 after, one note each
+PATIENT_COUNT = 4
+
+# Fields shared by every patient payload
+BASE_PATIENT = {"group": "General"}
+
+# Fake data for the whole run, generated once up front (Faker is not thread-safe).
+# Names are drawn unique: patient names are unique per user
+PATIENT_PAYLOADS = [
+    {
+        **BASE_PATIENT,
+        "name": fake.unique.name(),
+        "phone": fake.phone_number()[:15],
+        "email": fake.email(),
+        "address": fake.address(),
+        "location": fake.city(),
+        "initial_complaint": fake.sentence(),
+    }
+    for _ in range(PATIENT_COUNT)
+]
+NOTE_CONTENTS = [fake.text() for _ in range(PATIENT_COUNT)]
+
 # Report Data
 report_lines = ["# Integration Test Report", "", "## Summary", ""]
 
@@ -36,11 +64,93 @@ def get_db_connection():
     db = client[db_name]
     return db["users"]
 
+def wait_for_otp(users_collection, email, timeout=2.0, interval=0.05):
+    """
+    Poll for the user's document until it carries an OTP code.
+
+    Registration usually stores the OTP before it responds, so the first read
+    normally succeeds; polling only waits as long as the write actually takes.
+    Returns the last document read (None if the user never appeared).
+    """
+    deadline = time.monotonic() + timeout
+    while True:
+        user_doc = users_collection.find_one({"email": email}, {"otp_code": 1})
+        if (user_doc and user_doc.get("otp_code")) or time.monotonic() >= deadline:
+            return user_doc
+        time.sleep(interval)
+
+def build_session():
+    """
+    Create the HTTP session used for every request in the run.
+
+    All calls go to one host, so a single keep-alive pool is shared. Transient
+    gateway errors (e.g. while the server restarts) are retried on idempotent
+    requests only; POSTs are never replayed so nothing is created twice.
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=4,
+        pool_maxsize=HTTP_POOL_MAXSIZE,
+        max_retries=Retry(total=3, backoff_factor=0.1, status_forcelist=[502, 503, 504])
+    )
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+def map_concurrently(send, items):
+    """
+    Run `send` on every item concurrently and return the results in input order.
+
+    The requests are independent, so they share the session's keep-alive pool
+    instead of waiting on each other's round trip.
+    """
+    max_workers = min(len(items), HTTP_POOL_MAXSIZE) or 1
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(send, items))
+
+def post_all(session, requests_to_send):
+    """POST (url, payload) pairs concurrently over the shared session."""
+    return map_concurrently(lambda r: session.post(r[0], json=r[1]), requests_to_send)
+
+def get_all(session, urls):
+    """GET urls concurrently over the shared session."""
+    return map_concurrently(session.get, urls)
+
+def create_patients(session, payloads):
+    """Create a patient per payload. Returns them, or None if any creation failed."""
+    responses = post_all(session, [(f"{API_URL}/patients/", payload) for payload in payloads])
+
+    patients = []
+    for resp in responses:
+        if resp.status_code != 201:
+            log_report(f"Patient creation failed: {resp.text}")
+            return None
+        patient = resp.json()
+        patients.append(patient)
+        log_report(f"Created patient: {patient['name']} (ID: {patient['id']}, PID: {patient['patient_id']})")
+    return patients
+
+def create_notes(session, patients, contents, visit_type):
+    """Create one note per patient. Returns False if any creation failed."""
+    requests_to_send = [
+        (f"{API_URL}/patients/{patient['id']}/notes", {"content": content, "visit_type": visit_type})
+        for patient, content in zip(patients, contents)
+    ]
+    responses = post_all(session, requests_to_send)
+
+    for patient, resp in zip(patients, responses):
+        if resp.status_code != 201:
+            log_report(f"Note creation failed: {resp.text}")
+            return False
+        note = resp.json()
+        log_report(f"Created note for {patient['name']}: {note['id']}")
+    return True
+
 def run_test():
     # Get database connection (validates MONGO_URL is set)
     users_collection = get_db_connection()
 
-    session = requests.Session()
+    session = build_session()
 
     # --- Step 1: Create New User ---
     log_report("### Step 1: User Creation")
@@ -66,8 +176,7 @@ def run_test():
     # --- Step 2: Verify OTP ---
     log_report("### Step 2: OTP Verification")
     # Fetch OTP from DB
-    time.sleep(1) # Wait for DB update
-    user_doc = users_collection.find_one({"email": email})
+    user_doc = wait_for_otp(users_collection, email)
     if not user_doc:
         log_report("User not found in database!")
         return
@@ -105,38 +214,14 @@ def run_test():
 
     # --- Step 4: Create 2 Patients ---
     log_report("### Step 4: Create 2 Patients")
-    patients = []
-    for i in range(2):
-        patient_data = {
-            "name": fake.name(),
-            "phone": fake.phone_number()[:15],
-            "email": fake.email(),
-            "address": fake.address(),
-            "location": fake.city(),
-            "initial_complaint": fake.sentence(),
-            "group": "General"
-        }
-        resp = session.post(f"{API_URL}/patients/", json=patient_data)
-        if resp.status_code != 201:
-            log_report(f"Patient creation failed: {resp.text}")
-            return
-        patient = resp.json()
-        patients.append(patient)
-        log_report(f"Created patient: {patient['name']} (ID: {patient['id']}, PID: {patient['patient_id']})")
+    patients = create_patients(session, PATIENT_PAYLOADS[:2])
+    if patients is None:
+        return
 
     # --- Step 5: Create Notes for Each Patient ---
     log_report("### Step 5: Create Notes")
-    for patient in patients:
-        note_data = {
-            "content": fake.text(),
-            "visit_type": "regular"
-        }
-        resp = session.post(f"{API_URL}/patients/{patient['id']}/notes", json=note_data)
-        if resp.status_code != 201:
-            log_report(f"Note creation failed: {resp.text}")
-            return
-        note = resp.json()
-        log_report(f"Created note for {patient['name']}: {note['id']}")
+    if not create_notes(session, patients, NOTE_CONTENTS[:2], "regular"):
+        return
 
     # --- Step 6: Sync Check 1 (Logout/Login simulated) ---
     log_report("### Step 6: Sync Check 1 (Full Sync)")
@@ -165,36 +250,12 @@ def run_test():
 
     # --- Step 7: Create 2 More Patients + Notes ---
     log_report("### Step 7: Create 2 More Patients")
-    new_patients = []
-    for i in range(2):
-        patient_data = {
-            "name": fake.name(),
-            "phone": fake.phone_number()[:15],
-            "email": fake.email(),
-            "address": fake.address(),
-            "location": fake.city(),
-            "initial_complaint": fake.sentence(),
-            "group": "General"
-        }
-        resp = session.post(f"{API_URL}/patients/", json=patient_data)
-        if resp.status_code != 201:
-            log_report(f"Patient creation failed: {resp.text}")
-            return
-        patient = resp.json()
-        new_patients.append(patient)
-        log_report(f"Created patient: {patient['name']} (ID: {patient['id']}, PID: {patient['patient_id']})")
+    new_patients = create_patients(session, PATIENT_PAYLOADS[2:])
+    if new_patients is None:
+        return
 
-    for patient in new_patients:
-        note_data = {
-            "content": fake.text(),
-            "visit_type": "follow-up"
-        }
-        resp = session.post(f"{API_URL}/patients/{patient['id']}/notes", json=note_data)
-        if resp.status_code != 201:
-            log_report(f"Note creation failed: {resp.text}")
-            return
-        note = resp.json()
-        log_report(f"Created note for {patient['name']}: {note['id']}")
+    if not create_notes(session, new_patients, NOTE_CONTENTS[2:], "follow-up"):
+        return
 
     # --- Step 8: Sync Check 2 (Incremental or Full) ---
     # The user asked: "logout and login to check if all data returned."
@@ -224,8 +285,15 @@ def run_test():
     # --- Step 9: Verify Standard REST Endpoints ---
     log_report("### Step 9: Verify Standard REST Endpoints")
 
+    # List patients, plus details and notes for one patient, in a single concurrent batch
+    urls = [f"{API_URL}/patients/"]
+    if created_patients:
+        pid = created_patients[0]["id"]
+        urls += [f"{API_URL}/patients/{pid}", f"{API_URL}/patients/{pid}/notes"]
+    responses = get_all(session, urls)
+
     # List Patients
-    resp = session.get(f"{API_URL}/patients/")
+    resp = responses[0]
     if resp.status_code != 200:
         log_report(f"List Patients failed: {resp.text}")
     else:
@@ -236,17 +304,16 @@ def run_test():
         else:
             log_report("WARNING: Standard API missing patients.")
 
-    # Check details for one patient
     if created_patients:
-        pid = created_patients[0]["id"]
-        resp = session.get(f"{API_URL}/patients/{pid}")
+        # Check details for one patient
+        resp = responses[1]
         if resp.status_code == 200:
             log_report(f"GET /patients/{pid} returned: " + json.dumps(resp.json(), indent=2))
         else:
             log_report(f"GET /patients/{pid} failed: {resp.text}")
 
         # Check notes for one patient
-        resp = session.get(f"{API_URL}/patients/{pid}/notes")
+        resp = responses[2]
         if resp.status_code == 200:
             notes_list = resp.json()
             log_report(f"GET /patients/{pid}/notes returned {len(notes_list)} notes.")
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Soft Delete Migration Script
+Backfills `deleted_at: null` on patients and clinical notes that predate the field,
+and drops the legacy sparse `idx_user_deleted_at` indexes.
+
+Sync queries match live records with `{"deleted_at": None}`. Storing the field
+explicitly on every document keeps those lookups on the (user_id, ...) indexes
+instead of falling back to `$exists` checks.
+
+The sparse (user_id, deleted_at) index was replaced by a partial index on
+soft-deleted documents, `idx_user_deleted_at_partial`, which the app creates
+at startup. The old index is dropped here rather than by the app: startup never
+drops indexes. Run this before deploying a release that declares the partial
+index. Safe to run multiple times.
+"""
+
+import asyncio
+from motor.motor_asyncio import AsyncIOMotorClient
+import os
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# MongoDB connection settings
+MONGODB_URL = os.getenv("MONGODB_URL", "mongodb://localhost:27017")
+DATABASE_NAME = os.getenv("DATABASE_NAME", "heallog")
+
+COLLECTIONS = ["patients", "clinical_notes"]
+
+# Indexes superseded by a redefinition under a new name, per collection
+LEGACY_INDEXES = {
+    "patients": ["idx_user_deleted_at"],
+    "clinical_notes": ["idx_user_deleted_at"],
+}
+
+
+async def drop_legacy_indexes(db):
+    """Drop superseded indexes that still exist. Also used by create_indexes.py"""
+    for collection_name, index_names in LEGACY_INDEXES.items():
+        existing_indexes = await db[collection_name].index_information()
+        for index_name in index_names:
+            if index_name in existing_indexes:
+                await db[collection_name].drop_index(index_name)
+                logger.info(f"✅ {collection_name}: dropped legacy index {index_name}")
+
+
+async def migrate_deleted_at():
+    """Set deleted_at to null on every document where the field is missing, then drop legacy indexes"""
+
+    # One-shot script: updates run one at a time, so a minimal pool is enough
+    client = AsyncIOMotorClient(
+        MONGODB_URL,
+        maxPoolSize=2,
+        serverSelectionTimeoutMS=5000,
+        appname="migrate_deleted_at"
+    )
+    try:
+        db = client[DATABASE_NAME]
+        logger.info(f"Connected to MongoDB: {DATABASE_NAME}")
+
+        for collection_name in COLLECTIONS:
+            result = await db[collection_name].update_many(
+                {"deleted_at": {"$exists": False}},
+                {"$set": {"deleted_at": None}}
+            )
+            logger.info(
+                f"✅ {collection_name}: backfilled deleted_at on {result.modified_count} documents"
+            )
+
+        await drop_legacy_indexes(db)
+
+        logger.info("\n✅ Migration complete!")
+
+    except Exception as e:
+        logger.error(f"❌ Error running migration: {str(e)}", exc_info=True)
+        raise
+    finally:
+        client.close()
+        logger.info("\nDatabase connection closed")
+
+if __name__ == "__main__":
+    print("Soft Delete Migration Script")
+    print("=" * 60)
+    print(f"MongoDB URL: {MONGODB_URL}")
+    print(f"Database: {DATABASE_NAME}")
+    print("=" * 60)
+    print("\nStarting migration...\n")
+
+    asyncio.run(migrate_deleted_at())
@@ -18,11 +18,13 @@ else
 fi
 
 # --- 2. Database Migrations/Indexes ---
-# Beanie automatically handles index creation on startup.
-# This is a placeholder for any future manual migration scripts.
-echo "🔄 Running database migrations (if any)..."
-# Example: python3 scripts/run_migrations.py
-echo "   (No manual migrations to run at this time.)"
+# Beanie creates the indexes declared on the models at startup, but never drops or
+# replaces one whose definition changed. Migrations remove superseded indexes first,
+# so they must run before the new release starts. Each one is safe to re-run.
+# The scripts read MONGODB_URL/DATABASE_NAME; fall back to the app's MONGO_URL/DB_NAME.
+echo "🔄 Running database migrations..."
+MONGODB_URL="${MONGODB_URL:-$MONGO_URL}" DATABASE_NAME="${DATABASE_NAME:-$DB_NAME}" \
+    python3 scripts/migrate_deleted_at.py
 
 
 # --- 3. Create Initial Admin User ---
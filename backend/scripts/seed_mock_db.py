@@ -5,15 +5,7 @@ from app.schemas.user import User, UserCreate
 from app.core.hashing import get_password_hash
 from app.core.config import settings
 from beanie import init_beanie
-from app.schemas.patient import Patient
-from app.schemas.clinical_note import ClinicalNote
-from app.schemas.document import Document
-from app.schemas.feedback import Feedback
-from app.schemas.telemetry import Telemetry
-from app.schemas.error_event import ErrorEvent
-from app.schemas.query_performance_event import QueryPerformanceEvent
-from app.schemas.sync_event import SyncEvent
-from app.schemas.beta_feedback import BetaFeedback
+from app.db.models import DOCUMENT_MODELS
 
 async def seed_db():
     print(f"Connecting to {settings.MONGO_URL}...")
@@ -22,17 +14,28 @@ async def seed_db():
     
     await init_beanie(
         database=db,
-        document_models=[User, Patient, ClinicalNote, Document, Feedback, Telemetry, ErrorEvent, QueryPerformanceEvent, SyncEvent, BetaFeedback],
-        allow_index_dropping=True
+        document_models=DOCUMENT_MODELS
     )
 
     print("Seeding test user...")
     
+    # Users are collected and inserted in one insert_many round-trip
+    users_to_insert = []
+    created_messages = []
+
     # Create a test user with a known password
     test_user_email = "test@example.com"
     test_password = "password123"
-    
-    existing_user = await User.find_one({"email": test_user_email})
+
+    # A legacy user (missing password hash) to verify the fix
+    legacy_user_email = "legacy@example.com"
+
+    # The existence checks are independent: run them concurrently
+    existing_user, existing_legacy = await asyncio.gather(
+        User.find_one({"email": test_user_email}),
+        User.find_one({"email": legacy_user_email})
+    )
+
     if existing_user:
         print(f"User {test_user_email} already exists.")
     else:
@@ -45,31 +48,32 @@ async def seed_db():
         
         # Manually create user to ensure password hash is set correctly
         password_hash = get_password_hash(test_password)
-        user = User(
+        users_to_insert.append(User(
             email=user_create.email,
             full_name=user_create.full_name,
             medical_specialty=user_create.medical_specialty,
             password_hash=password_hash,
             role="doctor",
             plan="basic"
-        )
-        await user.insert()
-        print(f"Created user: {test_user_email} / {test_password}")
+        ))
+        created_messages.append(f"Created user: {test_user_email} / {test_password}")
 
-    # Create a legacy user (missing password hash) to verify the fix
-    legacy_user_email = "legacy@example.com"
-    existing_legacy = await User.find_one({"email": legacy_user_email})
+    # Create the legacy user
     if not existing_legacy:
-        legacy_user = User(
+        users_to_insert.append(User(
             email=legacy_user_email,
             full_name="Legacy Doctor",
             medical_specialty="Old School",
             password_hash=None, # Explicitly None
             role="doctor",
             plan="basic"
-        )
-        await legacy_user.insert()
-        print(f"Created legacy user: {legacy_user_email} (no password hash)")
+        ))
+        created_messages.append(f"Created legacy user: {legacy_user_email} (no password hash)")
+
+    if users_to_insert:
+        await User.insert_many(users_to_insert)
+        for message in created_messages:
+            print(message)
 
 if __name__ == "__main__":
     asyncio.run(seed_db())
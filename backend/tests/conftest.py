@@ -16,16 +16,9 @@ from unittest.mock import MagicMock
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 from beanie import init_beanie
 from app.schemas.user import User
-from app.schemas.patient import Patient
-from app.schemas.clinical_note import ClinicalNote
-from app.schemas.document import Document
-from app.schemas.feedback import Feedback
-from app.schemas.error_event import ErrorEvent
-from app.schemas.query_performance_event import QueryPerformanceEvent
-from app.schemas.sync_event import SyncEvent
-from app.schemas.telemetry import Telemetry
 from app.schemas.beta_feedback import BetaFeedback
-from app.services.user_service import user_service
+from app.db.models import DOCUMENT_MODELS
+from app.services.user_service import user_service, _user_cache
 from app.services.feedback_service import feedback_service
 from app.db import session as db_session
 
@@ -52,10 +45,10 @@ async def db_client():
     # Patch the global client in app.db.session so that get_database() returns this mock client
     db_session.client = client
 
-    # Initialize Beanie with all the document models
+    # Initialize Beanie with all the document models, once for the whole session
     await init_beanie(
         database=database,
-        document_models=[User, Patient, ClinicalNote, Document, Feedback, ErrorEvent, QueryPerformanceEvent, SyncEvent, Telemetry, BetaFeedback]
+        document_models=DOCUMENT_MODELS
     )
 
     yield client
@@ -66,23 +59,20 @@ async def db_client():
 @pytest_asyncio.fixture(autouse=True)
 async def db(db_client):
     """
-    This fixture ensures that the database is initialized for every test
-    and clears all collections before each test run to ensure isolation.
-    """
-    await init_beanie(
-        database=db_client.test_medical_contacts,
-        document_models=[User, Patient, ClinicalNote, Document, Feedback, ErrorEvent, QueryPerformanceEvent, SyncEvent, Telemetry, BetaFeedback],
-        allow_index_dropping=True
-    )
-    collections = [User, Patient, ClinicalNote, Document, Feedback, ErrorEvent, QueryPerformanceEvent, SyncEvent, Telemetry, BetaFeedback]
-    for collection in collections:
-        await collection.delete_all()
+    This fixture clears all collections after each test to ensure isolation.
 
+    Beanie is initialized once per session (see db_client) and every test starts
+    from the empty database the previous teardown left, so collections are
+    cleared once per test rather than before and after it. Indexes survive
+    the clear, so nothing needs re-initializing.
+    """
     user_service.user_collection = User
     feedback_service.feedback_collection = BetaFeedback
     yield
-    for collection in collections:
-        await collection.delete_all()
+    # Collections are independent: clear them concurrently
+    await asyncio.gather(*(collection.delete_all() for collection in DOCUMENT_MODELS))
+    # delete_all bypasses the Beanie hooks that evict cached users, so drop them here
+    _user_cache.clear()
 
 import time
 import pytest
@@ -111,12 +101,23 @@ def beta_user() -> UserCreate:
 def mock_sentry(mocker):
     mocker.patch("sentry_sdk.capture_exception")
 
+# Per-test durations, reported once at the end of the run instead of printed per test
+_test_timings = {}
+SLOWEST_TESTS_REPORTED = 10
+
 @pytest.fixture(autouse=True)
 def time_test(request):
-    start_time = time.time()
+    start_time = time.perf_counter()
     yield
-    end_time = time.time()
-    print(f"Test {request.node.name} took {end_time - start_time:.2f}s")
+    _test_timings[request.node.nodeid] = time.perf_counter() - start_time
+
+def pytest_terminal_summary(terminalreporter):
+    if not _test_timings:
+        return
+    slowest = sorted(_test_timings.items(), key=lambda item: item[1], reverse=True)
+    terminalreporter.section(f"slowest {min(len(slowest), SLOWEST_TESTS_REPORTED)} tests")
+    for name, duration in slowest[:SLOWEST_TESTS_REPORTED]:
+        terminalreporter.write_line(f"Test {name} took {duration:.2f}s")
 
 @pytest_asyncio.fixture
 async def app(limiter):
@@ -3,6 +3,7 @@ from httpx import AsyncClient, ASGITransport
 from app.schemas.user import User
 from app.core.hashing import get_password_hash
 from app.core.security import create_refresh_token
+import asyncio
 import uuid
 
 @pytest.mark.asyncio
@@ -59,3 +60,29 @@ async def test_register_duplicate_email_returns_409(db, app):
 
     assert response.status_code == 409
     assert "already exists" in response.json()["error"]["message"]
+
+@pytest.mark.asyncio
+async def test_concurrent_duplicate_registration_returns_409(db, app):
+    """
+    Tests that two simultaneous registrations for the same email yield one 201
+    and one 409: the unique email index rejects the second insert, and the
+    DuplicateKeyError is reported as a conflict rather than a 500.
+    """
+    registration = {
+        "email": "race@example.com",
+        "password": "NewPassword123!",
+        "full_name": "Race User"
+    }
+
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        responses = await asyncio.gather(
+            ac.post("/api/auth/register", json=registration),
+            ac.post("/api/auth/register", json=registration)
+        )
+
+    assert sorted(response.status_code for response in responses) == [201, 409]
+    conflict = next(response for response in responses if response.status_code == 409)
+    assert "already exists" in conflict.json()["error"]["message"]
+    assert await User.find({"email": "race@example.com"}).count() == 1
+
@@ -0,0 +1,72 @@
+import asyncio
+import pytest
+import pytest_asyncio
+import fakeredis
+from app.core.cache import ResilientCacheBackend
+
+
+@pytest_asyncio.fixture
+async def server():
+    return fakeredis.FakeServer()
+
+
+@pytest_asyncio.fixture
+async def backend(server):
+    backend = ResilientCacheBackend(fakeredis.FakeAsyncRedis(server=server), retry_interval=0.01)
+    backend.start()
+    yield backend
+    await backend.close()
+
+
+async def wait_for_recovery(backend: ResilientCacheBackend) -> None:
+    for _ in range(100):
+        if backend._redis_up:
+            return
+        await asyncio.sleep(0.01)
+    raise AssertionError("cache backend did not switch back to Redis")
+
+
+@pytest.mark.asyncio
+async def test_outage_falls_back_to_memory(server, backend):
+    """
+    Tests that a Redis failure switches the cache to memory instead of
+    failing the request, and that Redis entries are not served meanwhile.
+    """
+    await backend.set("ns:cached", "redis value", 60)
+    server.connected = False
+
+    assert await backend.get("ns:cached") is None
+    await backend.set("ns:outage", "memory value", 60)
+    assert await backend.get("ns:outage") == "memory value"
+
+
+@pytest.mark.asyncio
+async def test_outage_clear_of_missing_key_returns_zero(server, backend):
+    """
+    Tests that invalidating a key that was never cached during an outage is a
+    no-op rather than a KeyError (and so a 500) while Redis is down.
+    """
+    server.connected = False
+    await backend.get("ns:warm")  # detects the outage
+
+    assert await backend.clear(key="ns:never-cached") == 0
+    assert await backend.clear(namespace="ns") == 0
+
+
+@pytest.mark.asyncio
+async def test_recovery_replays_clears_and_drops_memory_entries(server, backend):
+    """
+    Tests that clears made during an outage are replayed on Redis on recovery,
+    and that entries cached in memory are not served by a later outage.
+    """
+    await backend.set("ns:stale", "old value", 60)
+    server.connected = False
+    await backend.clear(key="ns:stale")
+    await backend.set("ns:outage", "memory value", 60)
+
+    server.connected = True
+    await wait_for_recovery(backend)
+    assert await backend.get("ns:stale") is None
+
+    server.connected = False
+    assert await backend.get("ns:outage") is None
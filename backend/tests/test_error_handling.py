@@ -3,6 +3,7 @@ from httpx import ASGITransport, AsyncClient
 import pytest
 
 from app.core.exceptions import APIException, api_exception_handler
+from app.core.logging_config import set_request_id
 import uuid
 
 # Create a new FastAPI app instance for testing
@@ -10,7 +11,7 @@ test_app = FastAPI()
 
 @test_app.middleware("http")
 async def add_request_id(request: Request, call_next):
-    request.state.request_id = str(uuid.uuid4())
+    set_request_id(str(uuid.uuid4()))
     response = await call_next(request)
     return response
 
@@ -1,4 +1,5 @@
 from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse
 from slowapi import _rate_limit_exceeded_handler
 from slowapi.errors import RateLimitExceeded
 from app.api import (
@@ -9,7 +10,7 @@ from app.core.exceptions import APIException, api_exception_handler
 from app.middleware.logging import LoggingMiddleware
 
 def create_test_app(limiter):
-    app = FastAPI()
+    app = FastAPI(default_response_class=ORJSONResponse)
     app.state.limiter = limiter
     app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
     app.add_exception_handler(APIException, api_exception_handler)
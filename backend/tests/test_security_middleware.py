@@ -0,0 +1,118 @@
+import pytest
+from fastapi import FastAPI
+from httpx import AsyncClient, ASGITransport
+from app.core.config import settings
+from main import SecurityMiddleware
+
+ALLOWED_ORIGIN = "https://app.example.com"
+
+
+@pytest.fixture
+def client(monkeypatch):
+    """A minimal app behind SecurityMiddleware, with a single allowed origin."""
+    monkeypatch.setattr(SecurityMiddleware, "ALLOWED_ORIGINS", frozenset({ALLOWED_ORIGIN}))
+    monkeypatch.setattr(SecurityMiddleware, "ALLOW_ANY_ORIGIN", False)
+
+    app = FastAPI()
+    app.add_middleware(SecurityMiddleware)
+
+    @app.get("/api/items")
+    async def list_items():
+        return {"items": []}
+
+    @app.post("/api/items")
+    async def create_item():
+        return {"created": True}
+
+    @app.post("/api/auth/login")
+    async def login():
+        return {"logged_in": True}
+
+    return AsyncClient(transport=ASGITransport(app=app), base_url="http://test")
+
+
+def assert_security_headers(response):
+    assert response.headers["x-content-type-options"] == "nosniff"
+    assert response.headers["x-frame-options"] == "DENY"
+    assert response.headers["referrer-policy"] == "strict-origin-when-cross-origin"
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("headers", [
+    {"Origin": ALLOWED_ORIGIN},
+    {"Referer": f"{ALLOWED_ORIGIN}/patients?page=2"},
+    {"Authorization": "Bearer token"},
+    # Bearer tokens are CSRF-safe, so the origin is not checked at all
+    {"Authorization": "Bearer token", "Origin": "https://evil.example.com"},
+])
+async def test_state_changing_request_allowed(client, headers):
+    async with client as ac:
+        response = await ac.post("/api/items", headers=headers)
+
+    assert response.status_code == 200
+    assert response.json() == {"created": True}
+    assert_security_headers(response)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("headers, detail", [
+    ({"Origin": "https://evil.example.com"}, "CSRF validation failed: Origin not allowed"),
+    ({"Referer": "https://evil.example.com/form"}, "CSRF validation failed: Referer not allowed"),
+])
+async def test_state_changing_request_from_other_origin_rejected(client, headers, detail):
+    async with client as ac:
+        response = await ac.post("/api/items", headers=headers)
+
+    assert response.status_code == 403
+    assert response.json() == {"detail": detail}
+    # Rejections carry the security headers too
+    assert_security_headers(response)
+
+
+@pytest.mark.asyncio
+async def test_request_without_origin_information(client, monkeypatch):
+    async with client as ac:
+        # Allowed outside production, for local testing
+        response = await ac.post("/api/items")
+        assert response.status_code == 200
+
+        monkeypatch.setattr(settings, "ENV", "production")
+        response = await ac.post("/api/items")
+        assert response.status_code == 403
+        assert response.json() == {"detail": "CSRF validation failed: No origin information"}
+
+        # Safe methods and auth endpoints are never CSRF-checked
+        assert (await ac.get("/api/items")).status_code == 200
+        assert (await ac.post("/api/auth/login")).status_code == 200
+
+
+@pytest.mark.asyncio
+async def test_request_body_too_large_rejected(client):
+    async with client as ac:
+        response = await ac.post(
+            "/api/items",
+            headers={"Authorization": "Bearer token", "Content-Length": str(SecurityMiddleware.DEFAULT_MAX_SIZE + 1)},
+        )
+
+    assert response.status_code == 413
+    assert response.json() == {"detail": "Request body too large. Maximum size is 10MB"}
+    assert_security_headers(response)
+
+
+@pytest.mark.asyncio
+async def test_non_http_scope_passed_through_untouched():
+    received = []
+    sent = []
+
+    async def inner_app(scope, receive, send):
+        received.append(scope)
+        await send({"type": "lifespan.startup.complete"})
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {"type": "lifespan"}
+    await SecurityMiddleware(inner_app)(scope, None, send)
+
+    assert received == [scope]
+    assert sent == [{"type": "lifespan.startup.complete"}]
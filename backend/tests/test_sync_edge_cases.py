@@ -3,7 +3,11 @@ from httpx import AsyncClient, ASGITransport
 from tests.test_main import create_test_app
 from app.schemas.user import User
 from app.schemas.patient import Patient
+from app.schemas.clinical_note import ClinicalNote
+from app.services import sync_service
 from app.core.security import create_access_token
+from app.core.exceptions import SyncConflictException
+import asyncio
 import uuid
 import datetime
 
@@ -136,3 +140,208 @@ async def test_large_batch_sync(db, limiter):
     app = create_test_app(limiter)
     # This is a placeholder test that will be implemented in a future step.
     assert True
+
+
+async def pull_all_batches(user_id, batch_size):
+    """Page through pull_changes_batched from scratch, returning every batch response."""
+    batches = []
+    cursor_patient = cursor_note = None
+    while True:
+        batch = await sync_service.pull_changes_batched(
+            0, user_id, batch_size=batch_size, cursor_patient=cursor_patient, cursor_note=cursor_note
+        )
+        batches.append(batch)
+        if not batch["has_more"]:
+            return batches
+        cursor_patient, cursor_note = batch["cursor_patient"], batch["cursor_note"]
+
+
+def pulled_ids(batches, collection):
+    return [
+        record["id"]
+        for batch in batches
+        for record in batch["changes"][collection]["created"] + batch["changes"][collection]["updated"]
+    ]
+
+
+def test_sync_cursor_round_trip():
+    """
+    Tests that a cursor decodes back to the (created_at, id) position it encodes,
+    at millisecond precision, with naive datetimes read as UTC.
+    """
+    created_at = datetime.datetime(2024, 5, 17, 10, 30, 15, 123456, tzinfo=datetime.timezone.utc)
+    cursor = sync_service.encode_sync_cursor(created_at, "record_1")
+
+    cursor_dt = created_at.replace(microsecond=123000)
+    assert sync_service.cursor_filter(cursor) == {"$or": [
+        {"created_at": {"$gt": cursor_dt}},
+        {"created_at": cursor_dt, "_id": {"$gt": "record_1"}}
+    ]}
+    assert sync_service.encode_sync_cursor(created_at.replace(tzinfo=None), "record_1") == cursor
+
+
+@pytest.mark.asyncio
+async def test_batched_pull_pages_through_tied_created_at(db, monkeypatch):
+    """
+    Tests that records sharing one created_at are split across pages without
+    being skipped or repeated: the id breaks the tie in the cursor.
+    """
+    monkeypatch.setattr(sync_service, "MIN_BATCH_SIZE", 1)
+    user_id = str(uuid.uuid4())
+    created_at = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(days=1)
+    patient_ids = []
+    for i in range(5):
+        patient = Patient(
+            patient_id=str(uuid.uuid4()),
+            name=f"Tied Patient {i}",
+            user_id=user_id,
+            created_at=created_at,
+            updated_at=created_at,
+        )
+        await patient.insert()
+        patient_ids.append(patient.id)
+
+    batches = await pull_all_batches(user_id, batch_size=2)
+
+    assert len(batches) == 3
+    assert sorted(pulled_ids(batches, "patients")) == sorted(patient_ids)
+
+
+@pytest.mark.asyncio
+async def test_batched_pull_keeps_cursor_of_exhausted_collection(db, monkeypatch):
+    """
+    Tests that a collection exhausted on an earlier page keeps its cursor while
+    the other collection still has pages, so its records are not re-sent.
+    """
+    monkeypatch.setattr(sync_service, "MIN_BATCH_SIZE", 1)
+    user_id = str(uuid.uuid4())
+    patient = Patient(patient_id=str(uuid.uuid4()), name="Only Patient", user_id=user_id)
+    await patient.insert()
+    for i in range(3):
+        await ClinicalNote(patient_id=patient.id, user_id=user_id, content=f"Note {i}").insert()
+
+    batches = await pull_all_batches(user_id, batch_size=2)
+
+    assert len(batches) == 2
+    assert batches[0]["cursor_patient"] is not None
+    assert pulled_ids(batches, "patients") == [patient.id]
+    assert len(set(pulled_ids(batches, "clinical_notes"))) == 3
+
+
+@pytest.mark.asyncio
+async def test_batched_pull_sends_records_with_corrupt_created_at_once(db, monkeypatch):
+    """
+    Tests that records whose created_at is missing or not a date do not fail the
+    pull: they are sent once, with the first batch, and paging continues.
+    """
+    monkeypatch.setattr(sync_service, "MIN_BATCH_SIZE", 1)
+    user_id = str(uuid.uuid4())
+    now = datetime.datetime.now(datetime.timezone.utc)
+    for i in range(3):
+        await Patient(patient_id=str(uuid.uuid4()), name=f"Dated Patient {i}", user_id=user_id).insert()
+    collection = Patient.get_motor_collection()
+    for corrupt_id, created_at in (("corrupt-string", "2024-01-01T00:00:00Z"), ("corrupt-missing", None)):
+        document = {"_id": corrupt_id, "patient_id": corrupt_id, "name": "Corrupt Patient",
+                    "user_id": user_id, "updated_at": now, "deleted_at": None}
+        if created_at is not None:
+            document["created_at"] = created_at
+        await collection.insert_one(document)
+
+    batches = await pull_all_batches(user_id, batch_size=2)
+
+    ids = pulled_ids(batches, "patients")
+    assert len(ids) == 5 and len(set(ids)) == 5
+    assert {"corrupt-string", "corrupt-missing"} <= set(pulled_ids(batches[:1], "patients"))
+
+
+
+def millis(dt):
+    return int(dt.timestamp() * 1000)
+
+
+@pytest.mark.asyncio
+async def test_push_updates_patient_with_legacy_updated_at(db):
+    """
+    Tests that a patient whose stored updated_at is an ISO string (legacy rows)
+    can still be updated instead of being reported as a conflict on every push.
+    """
+    user_id = str(uuid.uuid4())
+    await Patient.get_motor_collection().insert_one({
+        "_id": "legacy-patient", "patient_id": "legacy-patient", "name": "Legacy Name",
+        "user_id": user_id, "created_at": "2024-01-01T00:00:00Z",
+        "updated_at": "2024-01-01T00:00:00Z", "deleted_at": None
+    })
+    now = datetime.datetime.now(datetime.timezone.utc)
+
+    await sync_service.push_changes({"patients": {"created": [], "updated": [
+        {"id": "legacy-patient", "name": "Pushed Name", "updated_at": millis(now)}
+    ], "deleted": []}}, user_id)
+
+    stored = await Patient.get_motor_collection().find_one({"_id": "legacy-patient"})
+    assert stored["name"] == "Pushed Name"
+
+
+@pytest.mark.asyncio
+async def test_push_conflict_applies_nothing(db):
+    """
+    Tests that a push with one stale patient update is rejected before any
+    write: neither the fresh patient update nor the note changes are applied.
+    """
+    user_id = str(uuid.uuid4())
+    now = datetime.datetime.now(datetime.timezone.utc)
+    stale = Patient(patient_id=str(uuid.uuid4()), name="Server Name", user_id=user_id, updated_at=now)
+    fresh = Patient(patient_id=str(uuid.uuid4()), name="Fresh Name", user_id=user_id,
+                    updated_at=now - datetime.timedelta(days=2))
+    await stale.insert()
+    await fresh.insert()
+    client_updated_at = millis(now - datetime.timedelta(days=1))
+
+    with pytest.raises(SyncConflictException) as exc_info:
+        await sync_service.push_changes({
+            "patients": {"created": [], "updated": [
+                {"id": stale.id, "name": "Stale Client Name", "updated_at": client_updated_at},
+                {"id": fresh.id, "name": "Fresh Client Name", "updated_at": client_updated_at}
+            ], "deleted": []},
+            "clinical_notes": {"created": [
+                {"id": "pushed-note", "patient_id": fresh.id, "content": "Pushed note"}
+            ], "updated": [], "deleted": []}
+        }, user_id)
+
+    assert stale.id in exc_info.value.detail
+    assert (await Patient.get(stale.id)).name == "Server Name"
+    assert (await Patient.get(fresh.id)).name == "Fresh Name"
+    assert await ClinicalNote.get("pushed-note") is None
+
+
+@pytest.mark.asyncio
+async def test_push_failure_cancels_the_other_pipeline(db, monkeypatch):
+    """
+    Tests that when one collection pipeline fails, the other is cancelled and
+    awaited before the error propagates, instead of writing on unsupervised.
+    """
+    user_id = str(uuid.uuid4())
+    note_insert_cancelled = asyncio.Event()
+
+    async def failing_patient_insert(*args, **kwargs):
+        await asyncio.sleep(0)
+        raise RuntimeError("patient insert failed")
+
+    async def slow_note_insert(*args, **kwargs):
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            note_insert_cancelled.set()
+            raise
+
+    monkeypatch.setattr(Patient, "insert_many", failing_patient_insert)
+    monkeypatch.setattr(ClinicalNote, "insert_many", slow_note_insert)
+
+    with pytest.raises(RuntimeError, match="patient insert failed"):
+        await asyncio.wait_for(sync_service.push_changes({
+            "patients": {"created": [{"id": "new-patient", "patient_id": "p", "name": "New Patient"}],
+                         "updated": [], "deleted": []},
+            "clinical_notes": {"created": [{"id": "new-note", "patient_id": "new-patient", "content": "Note"}],
+                               "updated": [], "deleted": []}
+        }, user_id), timeout=5)
+
+    assert note_insert_cancelled.is_set()
@@ -0,0 +1,134 @@
+import asyncio
+import pytest
+import pytest_asyncio
+import fakeredis
+from datetime import datetime, timedelta, timezone
+from app.services.token_blacklist_service import TokenBlacklistService
+
+
+async def make_service(server: fakeredis.FakeServer) -> TokenBlacklistService:
+    """A blacklist service wired to a fake Redis the same way initialize() wires a real one."""
+    service = TokenBlacklistService()
+    service._redis = fakeredis.FakeAsyncRedis(server=server, decode_responses=True)
+    service._register_scripts()
+    service._redis_available = True
+    await service._start_invalidation_listener()
+    return service
+
+
+async def wait_for_eviction(service: TokenBlacklistService, jti: str) -> None:
+    for _ in range(100):
+        if jti not in service._negative_cache:
+            return
+        await asyncio.sleep(0.01)
+    raise AssertionError(f"{jti} was not evicted from the negative cache")
+
+
+@pytest_asyncio.fixture
+async def services():
+    """Two service instances sharing one Redis, as two app workers would."""
+    server = fakeredis.FakeServer()
+    first, second = await make_service(server), await make_service(server)
+    yield first, second
+    await first.close()
+    await second.close()
+
+
+@pytest.mark.asyncio
+async def test_revoked_jti_is_rejected(services):
+    service, _ = services
+    await service.blacklist_token("revoked-jti", datetime.now(timezone.utc) + timedelta(hours=1))
+
+    issued_at = datetime.now(timezone.utc)
+    assert await service.is_token_blacklisted("revoked-jti", "user-1", issued_at)
+    assert await service.is_token_blacklisted("revoked-jti")
+
+
+@pytest.mark.asyncio
+async def test_non_revoked_token_is_accepted(services):
+    service, _ = services
+    await service.blacklist_token("other-jti", datetime.now(timezone.utc) + timedelta(hours=1))
+
+    assert not await service.is_token_blacklisted("valid-jti", "user-1", datetime.now(timezone.utc))
+    assert not await service.is_token_blacklisted("valid-jti-2")
+
+
+@pytest.mark.asyncio
+async def test_user_marker_rejects_only_tokens_issued_before_it(services):
+    service, _ = services
+    marker = datetime.now(timezone.utc)
+    await service.blacklist_user_tokens("user-1", marker)
+
+    assert await service.is_token_blacklisted("old-jti", "user-1", marker - timedelta(seconds=1))
+    assert not await service.is_token_blacklisted("new-jti", "user-1", marker + timedelta(seconds=1))
+    # The marker is per user
+    assert not await service.is_token_blacklisted("other-user-jti", "user-2", marker - timedelta(seconds=1))
+
+
+@pytest.mark.asyncio
+async def test_user_marker_never_moves_backwards(services):
+    service, _ = services
+    marker = datetime.now(timezone.utc)
+    await service.blacklist_user_tokens("user-1", marker)
+    await service.blacklist_user_tokens("user-1", marker - timedelta(hours=1))
+
+    assert await service.is_token_blacklisted("jti", "user-1", marker - timedelta(minutes=1))
+
+
+@pytest.mark.asyncio
+async def test_negative_cache_evicted_by_revocation_on_another_instance(services):
+    first, second = services
+    issued_at = datetime.now(timezone.utc) - timedelta(minutes=5)
+
+    # The first instance caches its "not blacklisted" answer
+    assert not await first.is_token_blacklisted("shared-jti", "user-1", issued_at)
+    assert "shared-jti" in first._negative_cache
+
+    await second.blacklist_token("shared-jti", datetime.now(timezone.utc) + timedelta(hours=1))
+    await wait_for_eviction(first, "shared-jti")
+    assert await first.is_token_blacklisted("shared-jti", "user-1", issued_at)
+
+
+@pytest.mark.asyncio
+async def test_negative_cache_evicted_by_user_revocation_on_another_instance(services):
+    first, second = services
+    issued_at = datetime.now(timezone.utc) - timedelta(minutes=5)
+
+    assert not await first.is_token_blacklisted("user-jti", "user-1", issued_at)
+
+    await second.blacklist_user_tokens("user-1", datetime.now(timezone.utc))
+    await wait_for_eviction(first, "user-jti")
+    assert await first.is_token_blacklisted("user-jti", "user-1", issued_at)
+
+
+@pytest.mark.asyncio
+async def test_eviction_during_check_is_not_overwritten(services, monkeypatch):
+    """
+    Tests that a revocation whose eviction arrives while a check is waiting on
+    Redis is not masked by that check caching its "not blacklisted" answer.
+    """
+    first, second = services
+    issued_at = datetime.now(timezone.utc) - timedelta(minutes=5)
+    evicted = asyncio.Event()
+    evict = first._evict_negative_cache
+
+    def evict_and_signal(event):
+        evict(event)
+        evicted.set()
+
+    monkeypatch.setattr(first, "_evict_negative_cache", evict_and_signal)
+    check_token = first._check_token
+
+    async def check_then_revoke(*args, **kwargs):
+        result = await check_token(*args, **kwargs)
+        # The revocation lands on another instance after Redis answered, before the caller resumes
+        await second.blacklist_token("racing-jti", datetime.now(timezone.utc) + timedelta(hours=1))
+        await asyncio.wait_for(evicted.wait(), timeout=1)
+        return result
+
+    monkeypatch.setattr(first, "_check_token", check_then_revoke)
+    assert not await first.is_token_blacklisted("racing-jti", "user-1", issued_at)
+    monkeypatch.setattr(first, "_check_token", check_token)
+
+    assert "racing-jti" not in first._negative_cache
+    assert await first.is_token_blacklisted("racing-jti", "user-1", issued_at)
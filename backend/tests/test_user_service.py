@@ -1,8 +1,12 @@
 import pytest
+import time
+from datetime import datetime, timedelta, timezone
 from unittest.mock import patch, AsyncMock
-from app.services.user_service import user_service
+from passlib.hash import bcrypt
+from app.services.user_service import user_service, get_user_by_id
 from app.schemas.user import UserCreate, User
 from app.core import hashing
+from app.services.otp_service import otp_service, _hash_otp
 
 @pytest.mark.asyncio
 async def test_create_user(db):
@@ -42,4 +46,91 @@ async def test_get_user_by_id(db):
         retrieved_user = await user_service.get("123")
 
         mock_get.assert_called_once_with("123")
-        assert retrieved_user == mock_user
\ No newline at end of file
+        assert retrieved_user == mock_user
+
+
+@pytest.mark.asyncio
+async def test_get_user_by_id_cache_evicted_on_save(db):
+    user = User(email="cache@example.com", full_name="Cache User")
+    await user.insert()
+
+    cached_user = await get_user_by_id(user.id)
+    cached_user.phone = "5551234"
+    await cached_user.save()
+
+    refreshed_user = await get_user_by_id(user.id)
+    assert refreshed_user.phone == "5551234"
+    assert refreshed_user is not cached_user
+
+
+@pytest.mark.asyncio
+async def test_get_user_by_id_cache_evicted_on_query_level_update(db):
+    """verify_otp increments otp_attempts with a query-level update, which bypasses the write hooks."""
+    user = User(
+        email="otpcache@example.com",
+        full_name="OTP Cache User",
+        otp_code=_hash_otp("12345678"),
+        otp_expires_at=datetime.now(timezone.utc) + timedelta(minutes=5)
+    )
+    await user.insert()
+
+    cached_user = await get_user_by_id(user.id)
+    assert cached_user.otp_attempts == 0
+
+    success, _ = await otp_service.verify_otp(cached_user, "87654321")
+    assert not success
+
+    refreshed_user = await get_user_by_id(user.id)
+    assert refreshed_user.otp_attempts == 1
+
+
+@pytest.mark.asyncio
+async def test_authenticate_upgrades_bcrypt_hash_to_argon2id(db):
+    legacy_hash = bcrypt.using(rounds=4).hash("CorrectHorse1!")
+    user = User(email="legacy@example.com", full_name="Legacy User", password_hash=legacy_hash)
+    await user.insert()
+
+    authenticated_user = await user_service.authenticate("legacy@example.com", "CorrectHorse1!")
+
+    assert authenticated_user is not None
+    stored = await User.get_motor_collection().find_one({"_id": user.id})
+    assert stored["password_hash"].startswith("$argon2id$")
+    assert authenticated_user.password_hash == stored["password_hash"]
+    assert hashing.verify_password("CorrectHorse1!", stored["password_hash"])
+
+
+@pytest.mark.asyncio
+async def test_authenticate_wrong_password_keeps_bcrypt_hash(db):
+    legacy_hash = bcrypt.using(rounds=4).hash("CorrectHorse1!")
+    user = User(email="legacy-wrong@example.com", full_name="Legacy User", password_hash=legacy_hash)
+    await user.insert()
+
+    assert await user_service.authenticate("legacy-wrong@example.com", "WrongHorse1!") is None
+
+    stored = await User.get_motor_collection().find_one({"_id": user.id})
+    assert stored["password_hash"] == legacy_hash
+
+
+@pytest.mark.asyncio
+async def test_authenticate_timing_does_not_reveal_accounts(db):
+    """
+    Tests that a failed login costs about the same whether the email is unknown
+    (dummy hash), an argon2id account or a legacy bcrypt account (default cost).
+    """
+    await User(email="argon@example.com", full_name="Argon User",
+               password_hash=hashing.get_password_hash("CorrectHorse1!")).insert()
+    await User(email="bcrypt@example.com", full_name="Bcrypt User",
+               password_hash=bcrypt.using(rounds=12).hash("CorrectHorse1!")).insert()
+
+    async def fastest_failed_login(email):
+        durations = []
+        for _ in range(3):
+            start = time.perf_counter()
+            assert await user_service.authenticate(email, "WrongHorse1!") is None
+            durations.append(time.perf_counter() - start)
+        return min(durations)
+
+    unknown = await fastest_failed_login("unknown@example.com")
+    for email in ("argon@example.com", "bcrypt@example.com"):
+        assert 0.6 < await fastest_failed_login(email) / unknown < 1.6
+
@@ -83,8 +83,8 @@ async function pullChangesBatched(lastPulledAt: number | null): Promise<{
     clinical_notes: { created: [], updated: [], deleted: [] },
   };
   let timestamp = Date.now();
-  let skipPatients = 0;
-  let skipNotes = 0;
+  let cursorPatient: string | null = null;
+  let cursorNote: string | null = null;
   let hasMore = true;
   let batchCount = 0;
 
@@ -100,13 +100,13 @@ async function pullChangesBatched(lastPulledAt: number | null): Promise<{
     }, {
       params: {
         batch_size: BATCH_SIZE,
-        skip_patients: skipPatients,
-        skip_notes: skipNotes,
+        ...(cursorPatient ? { cursor_patient: cursorPatient } : {}),
+        ...(cursorNote ? { cursor_note: cursorNote } : {}),
       },
       timeout: 30000,
     });
 
-    const { changes, has_more, next_skip_patients, next_skip_notes, timestamp: newTimestamp } = response.data;
+    const { changes, has_more, cursor_patient, cursor_note, timestamp: newTimestamp } = response.data;
 
     // Merge changes
     for (const table of ['patients', 'clinical_notes']) {
@@ -122,8 +122,8 @@ async function pullChangesBatched(lastPulledAt: number | null): Promise<{
 
     timestamp = newTimestamp;
     hasMore = has_more;
-    skipPatients = next_skip_patients || 0;
-    skipNotes = next_skip_notes || 0;
+    cursorPatient = cursor_patient || null;
+    cursorNote = cursor_note || null;
 
     devLog(`✅ [Sync] Batch ${batchCount} complete. Has more: ${hasMore}`);
   }